@@ -0,0 +1,58 @@
+from typing import Callable, Dict, Optional, Tuple, Type
+from pydantic import BaseModel
+from api.algorithms.knapsack import iter_knapsack_dp, iter_knapsack_greedy
+from api.algorithms.coin_change import iter_coin_change_dp, iter_coin_change_greedy
+from api.algorithms.interval_scheduling import iter_interval_scheduling_greedy, iter_interval_scheduling_dp
+from api.algorithms.matrix_chain import iter_matrix_chain_dp
+from api.algorithms.huffman import iter_huffman
+from api.algorithms.lcs import iter_lcs_dp
+from api.algorithms.dijkstra import iter_dijkstra
+from api.algorithms.prims import iter_prims
+from api.algorithms.kruskals import iter_kruskals
+from api.algorithms.edit_distance import iter_edit_distance_dp
+from api.algorithms.lis import iter_lis_dp
+from api.algorithms.rod_cutting import iter_rod_cutting_dp
+from api.models import (
+    AlgorithmType, KnapsackInput, CoinChangeInput,
+    IntervalSchedulingInput, MatrixChainInput, HuffmanInput, LCSInput,
+    DijkstraInput, EditDistanceInput, LISInput, RodCuttingInput
+)
+
+# Bump whenever a solver's output (steps, descriptions, results) changes: it is
+# part of every result cache key and ETag, so cached and client-held results
+# from an older engine are never served as current.
+ENGINE_VERSION = "2"
+
+# Problem name (as used in the /solve/... paths) -> input model and the
+# step generator for each algorithm type it supports.
+SOLVERS: Dict[str, Tuple[Type[BaseModel], Dict[AlgorithmType, Callable]]] = {
+    "knapsack": (KnapsackInput, {AlgorithmType.DP: iter_knapsack_dp, AlgorithmType.GREEDY: iter_knapsack_greedy}),
+    "coin-change": (CoinChangeInput, {AlgorithmType.DP: iter_coin_change_dp, AlgorithmType.GREEDY: iter_coin_change_greedy}),
+    "interval-scheduling": (IntervalSchedulingInput, {AlgorithmType.DP: iter_interval_scheduling_dp, AlgorithmType.GREEDY: iter_interval_scheduling_greedy}),
+    "matrix-chain": (MatrixChainInput, {AlgorithmType.DP: iter_matrix_chain_dp}),
+    "huffman": (HuffmanInput, {AlgorithmType.GREEDY: iter_huffman}),
+    "lcs": (LCSInput, {AlgorithmType.DP: iter_lcs_dp}),
+    "dijkstra": (DijkstraInput, {AlgorithmType.GREEDY: iter_dijkstra}),
+    "prims": (DijkstraInput, {AlgorithmType.GREEDY: iter_prims}),
+    "kruskals": (DijkstraInput, {AlgorithmType.GREEDY: iter_kruskals}),
+    "edit-distance": (EditDistanceInput, {AlgorithmType.DP: iter_edit_distance_dp}),
+    "lis": (LISInput, {AlgorithmType.DP: iter_lis_dp}),
+    "rod-cutting": (RodCuttingInput, {AlgorithmType.DP: iter_rod_cutting_dp}),
+}
+
+
+def get_solver(problem: str, algorithm_type: Optional[str] = None) -> Tuple[Type[BaseModel], Callable]:
+    """
+    Looks up the input model and step generator for a problem.
+    algorithm_type may be omitted for problems that only have one algorithm.
+    Raises KeyError / ValueError for unknown problems or algorithm types.
+    """
+    input_model, variants = SOLVERS[problem]
+    if algorithm_type is None:
+        if len(variants) != 1:
+            raise ValueError(f"{problem} needs an algorithm type: {', '.join(v.value for v in variants)}")
+        return input_model, next(iter(variants.values()))
+    try:
+        return input_model, variants[AlgorithmType(algorithm_type)]
+    except (ValueError, KeyError):
+        raise ValueError(f"Unknown algorithm type: {algorithm_type}")
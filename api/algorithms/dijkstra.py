@@ -1,12 +1,14 @@
 import heapq
-import time
 from typing import Dict, List, Any
-from api.models import Step, StepType, AlgorithmResult, Metrics, DijkstraInput
+from api.models import StepType, AlgorithmResult, ResultSummary, DijkstraInput, TraceDetail, TraceRecorder
+from api.context import context_ref
+from api.tracing import StepTrace, run_trace
 
-def solve_dijkstra(data: DijkstraInput) -> AlgorithmResult:
-    start_time = time.time()
-    steps = []
-    
+def solve_dijkstra(data: DijkstraInput, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_dijkstra(data, detail))
+
+def iter_dijkstra(data: DijkstraInput, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    record = TraceRecorder(detail)
     # Graph format: { "A": {"B": 4, "C": 2}, "B": {"C": 1, "D": 5}, ... }
     graph = data.graph
     start_node = data.start_node
@@ -25,16 +27,18 @@ def solve_dijkstra(data: DijkstraInput) -> AlgorithmResult:
     # Visited set
     visited = set()
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized Dijkstra from node {start_node}",
-        data={
-            "distances": {k: (float('inf') if v == float('inf') else 0) for k, v in distances.items()},
-            "visited": [],
-            "graph": graph,
-            "start_node": start_node
-        }
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized Dijkstra from node {start_node}",
+            data={
+                "distances": {k: (float('inf') if v == float('inf') else 0) for k, v in distances.items()},
+                "visited": [],
+                "graph": context_ref("graph"),
+                "start_node": start_node
+            },
+            context={"graph": graph}
+        )
     
     while pq:
         # Step: Sort happens implicitly in heap, but we can visualize "Selection"
@@ -46,31 +50,34 @@ def solve_dijkstra(data: DijkstraInput) -> AlgorithmResult:
 
         visited.add(current_node)
         
-        steps.append(Step(
-            type=StepType.HIGHLIGHT,
-            description=f"Visiting node {current_node} with distance {current_dist}",
-            data={
-                "current_node": current_node,
-                "current_dist": current_dist,
-                "visited": list(visited)
-            }
-        ))
+        if record.cells:
+            yield record.step(
+                type=StepType.HIGHLIGHT,
+                description=f"Visiting node {current_node} with distance {current_dist}",
+                data={
+                    "current_node": current_node,
+                    "current_dist": current_dist,
+                    "visited": list(visited)
+                }
+            )
         
+        relaxed = []
         # For each neighbor
         if current_node in graph:
             for neighbor, weight in graph[current_node].items():
                 if neighbor in visited:
                     continue
                     
-                steps.append(Step(
-                    type=StepType.HIGHLIGHT,
-                    description=f"Checking edge {current_node} -> {neighbor} (weight {weight})",
-                    data={
-                        "current_node": current_node,
-                        "checking_neighbor": neighbor,
-                        "edge_weight": weight
-                    }
-                ))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.HIGHLIGHT,
+                        description=f"Checking edge {current_node} -> {neighbor} (weight {weight})",
+                        data={
+                            "current_node": current_node,
+                            "checking_neighbor": neighbor,
+                            "edge_weight": weight
+                        }
+                    )
                 
                 new_dist = current_dist + weight
                 
@@ -79,27 +86,36 @@ def solve_dijkstra(data: DijkstraInput) -> AlgorithmResult:
                     distances[neighbor] = new_dist
                     predecessors[neighbor] = current_node
                     heapq.heappush(pq, (new_dist, neighbor))
+                    relaxed.append(neighbor)
                     
-                    steps.append(Step(
-                        type=StepType.UPDATE,
-                        description=f"Relaxing edge {current_node}->{neighbor}. Updated distance: {new_dist} (was {old_dist if old_dist != float('inf') else '∞'})",
-                        data={
-                            "node": neighbor,
-                            "new_dist": new_dist,
-                            "distances": {k: (9999 if v == float('inf') else v) for k, v in distances.items()} # Use 9999 for infinity in JSON
-                        }
-                    ))
-    
-    end_time = time.time()
+                    if record.cells:
+                        yield record.step(
+                            type=StepType.UPDATE,
+                            description=f"Relaxing edge {current_node}->{neighbor}. Updated distance: {new_dist} (was {old_dist if old_dist != float('inf') else '∞'})",
+                            decisive=True,
+                            data={
+                                "node": neighbor,
+                                "new_dist": new_dist,
+                                "distances": {k: (9999 if v == float('inf') else v) for k, v in distances.items()} # Use 9999 for infinity in JSON
+                            }
+                        )
+
+        if record.rows:
+            yield record.step(
+                type=StepType.UPDATE,
+                description=f"Expanded node {current_node} (distance {current_dist}), relaxed {len(relaxed)} edge(s)",
+                data={
+                    "current_node": current_node,
+                    "current_dist": current_dist,
+                    "visited": list(visited),
+                    "relaxed": relaxed,
+                    "distances": {k: (9999 if v == float('inf') else v) for k, v in distances.items()}
+                }
+            )
     
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=0, # Not a single scalar for Dijkstra typically, but could be max dist or ignored
         selected_items=[], # Not used
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity=f"O(V)",
-            time_complexity=f"O(E log V)",
-            step_count=len(steps)
-        )
+        space_complexity=f"O(V)",
+        time_complexity=f"O(E log V)"
     )
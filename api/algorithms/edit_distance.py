@@ -1,19 +1,33 @@
-import time
 from typing import List
-from api.models import Step, StepType, AlgorithmResult, Metrics
+from api.models import StepType, AlgorithmResult, ResultSummary, TraceDetail, TraceRecorder
+from api.descriptions import register_templates
+from api.context import context_ref
+from api.tracing import StepTrace, run_trace
+
+register_templates({
+    "edit_distance.compare": "Comparing '{0}' vs '{1}'",
+    "edit_distance.match": "Characters match! No operation needed. dp[{0}][{1}] = dp[{2}][{3}] = {4}",
+    "edit_distance.replace": "Replace '{0}' with '{1}'. min(insert:{2}, delete:{3}, replace:{4}) = {5}",
+    "edit_distance.insert": "Insert '{0}'. min(insert:{1}, delete:{2}, replace:{3}) = {4}",
+    "edit_distance.delete": "Delete '{0}'. min(insert:{1}, delete:{2}, replace:{3}) = {4}",
+    "edit_distance.row": "Filled row {0} ('{1}'): edit distances from text1[:{0}] to every prefix of text2, {2} to all of it",
+})
+
+OPERATION_TEMPLATES = {op: f"edit_distance.{op}" for op in ("replace", "insert", "delete")}
 
 class EditDistanceInput:
     text1: str
     text2: str
 
-def solve_edit_distance_dp(data) -> AlgorithmResult:
+def solve_edit_distance_dp(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_edit_distance_dp(data, detail))
+
+def iter_edit_distance_dp(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
     """
     Edit Distance (Levenshtein Distance) - DP Solution
     Finds minimum operations (insert, delete, replace) to convert text1 to text2.
     """
-    start_time = time.time()
-    steps = []
-    
+    record = TraceRecorder(detail)
     s1 = data.text1
     s2 = data.text2
     n = len(s1)
@@ -28,39 +42,43 @@ def solve_edit_distance_dp(data) -> AlgorithmResult:
     for j in range(m + 1):
         dp[0][j] = j
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized DP table of size ({n+1} x {m+1}). Base cases: dp[i][0]=i (delete all), dp[0][j]=j (insert all)",
-        data={
-            "rows": n + 1,
-            "cols": m + 1,
-            "row_labels": [""] + list(s1),
-            "col_labels": [""] + list(s2)
-        }
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized DP table of size ({n+1} x {m+1}). Base cases: dp[i][0]=i (delete all), dp[0][j]=j (insert all)",
+            data={
+                "rows": n + 1,
+                "cols": m + 1,
+                "row_labels": context_ref("row_labels"),
+                "col_labels": context_ref("col_labels")
+            },
+            context={"row_labels": [""] + list(s1), "col_labels": [""] + list(s2)}
+        )
     
     # Fill DP Table
     for i in range(1, n + 1):
         for j in range(1, m + 1):
             
             # Highlight current comparison
-            steps.append(Step(
-                type=StepType.HIGHLIGHT,
-                description=f"Comparing '{s1[i-1]}' vs '{s2[j-1]}'",
-                data={"i": i, "j": j, "compare": [s1[i-1], s2[j-1]]}
-            ))
+            if record.cells:
+                yield record.step(
+                    type=StepType.HIGHLIGHT,
+                    template="edit_distance.compare", args=[s1[i-1], s2[j-1]],
+                    data={"i": i, "j": j, "compare": [s1[i-1], s2[j-1]]}
+                )
             
             if s1[i-1] == s2[j-1]:
                 # Characters match - no operation needed
                 dp[i][j] = dp[i-1][j-1]
-                steps.append(Step(
-                    type=StepType.UPDATE,
-                    description=f"Characters match! No operation needed. dp[{i}][{j}] = dp[{i-1}][{j-1}] = {dp[i][j]}",
-                    data={
-                        "i": i, "j": j, "value": dp[i][j],
-                        "operation": "match"
-                    }
-                ))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.UPDATE,
+                        template="edit_distance.match", args=[i, j, i-1, j-1, dp[i][j]],
+                        data={
+                            "i": i, "j": j, "value": dp[i][j],
+                            "operation": "match"
+                        }
+                    )
             else:
                 # Take minimum of three operations
                 insert_cost = dp[i][j-1] + 1      # Insert character from s2
@@ -70,25 +88,34 @@ def solve_edit_distance_dp(data) -> AlgorithmResult:
                 min_cost = min(insert_cost, delete_cost, replace_cost)
                 dp[i][j] = min_cost
                 
-                if min_cost == replace_cost:
-                    op = "replace"
-                    desc = f"Replace '{s1[i-1]}' with '{s2[j-1]}'"
-                elif min_cost == insert_cost:
-                    op = "insert"
-                    desc = f"Insert '{s2[j-1]}'"
-                else:
-                    op = "delete"
-                    desc = f"Delete '{s1[i-1]}'"
-                
-                steps.append(Step(
-                    type=StepType.UPDATE,
-                    description=f"{desc}. min(insert:{insert_cost}, delete:{delete_cost}, replace:{replace_cost}) = {min_cost}",
-                    data={
-                        "i": i, "j": j, "value": min_cost,
-                        "operation": op,
-                        "choices": {"insert": insert_cost, "delete": delete_cost, "replace": replace_cost}
-                    }
-                ))
+                if record.cells:
+                    if min_cost == replace_cost:
+                        op = "replace"
+                        chars = [s1[i-1], s2[j-1]]
+                    elif min_cost == insert_cost:
+                        op = "insert"
+                        chars = [s2[j-1]]
+                    else:
+                        op = "delete"
+                        chars = [s1[i-1]]
+                    
+                    yield record.step(
+                        type=StepType.UPDATE,
+                        template=OPERATION_TEMPLATES[op],
+                        args=chars + [insert_cost, delete_cost, replace_cost, min_cost],
+                        data={
+                            "i": i, "j": j, "value": min_cost,
+                            "operation": op,
+                            "choices": {"insert": insert_cost, "delete": delete_cost, "replace": replace_cost}
+                        }
+                    )
+
+        if record.rows:
+            yield record.step(
+                type=StepType.UPDATE,
+                template="edit_distance.row", args=[i, s1[i-1], dp[i][m]],
+                data={"i": i, "row": dp[i]}
+            )
     
     # Backtrack to find the operations
     operations = []
@@ -111,22 +138,16 @@ def solve_edit_distance_dp(data) -> AlgorithmResult:
     
     operations.reverse()
     
-    steps.append(Step(
-        type=StepType.SOLUTION,
-        description=f"Edit Distance: {dp[n][m]} operations needed to convert '{s1}' to '{s2}'",
-        data={"distance": dp[n][m], "operations": operations}
-    ))
-    
-    end_time = time.time()
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description=f"Edit Distance: {dp[n][m]} operations needed to convert '{s1}' to '{s2}'",
+            data={"distance": dp[n][m], "operations": operations}
+        )
     
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=dp[n][m],
         selected_items=[],
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity=f"O({n}*{m})",
-            time_complexity=f"O({n}*{m})",
-            step_count=len(steps)
-        )
+        space_complexity=f"O({n}*{m})",
+        time_complexity=f"O({n}*{m})"
     )
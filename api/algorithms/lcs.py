@@ -1,14 +1,34 @@
-from api.models import Step, StepType, AlgorithmResult, Metrics
+from api.models import StepType, AlgorithmResult, ResultSummary, TraceDetail, TraceRecorder
+from api.descriptions import register_templates
+from api.context import context_ref
+from api.tracing import StepTrace, run_trace
 from collections import deque
-import time
+from itertools import accumulate
+from typing import Dict, List
+
+register_templates({
+    "lcs.compare": "Comparing '{0}' vs '{1}'",
+    "lcs.match": "Characters match! 1 + dp[{0}][{1}] = {2}",
+    "lcs.no_match": "No match. max(dp[{0}][{1}] ({2}), dp[{3}][{4}] ({5})) = {6}",
+    "lcs.split": "Rows {0}..{1} x columns {2}..{3}: split at row {4}, column {5} (LCS {6})",
+    "lcs.take": "'{0}' at text1[{1}] and text2[{2}] joins the LCS",
+    "lcs.bit_row": "Row {0} ('{1}'): LCS length so far {2}",
+})
 
 class LCSInput(object): # Placeholder, will be defined in models.py
     pass
 
-def solve_lcs_dp(data) -> AlgorithmResult:
-    start_time = time.time()
-    steps = []
-    
+def solve_lcs_dp(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_lcs_dp(data, detail))
+
+def solve_lcs_hirschberg(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_lcs_hirschberg(data, detail))
+
+def solve_lcs_bit_parallel(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_lcs_bit_parallel(data, detail))
+
+def iter_lcs_dp(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    record = TraceRecorder(detail)
     s1 = data.text1
     s2 = data.text2
     n = len(s1)
@@ -18,56 +38,69 @@ def solve_lcs_dp(data) -> AlgorithmResult:
     # Dimensions: (n+1) x (m+1) to accommodate empty strings at index 0.
     dp = [[0 for _ in range(m + 1)] for _ in range(n + 1)]
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized DP table of size ({n+1} x {m+1})",
-        data={
-            "rows": n + 1,
-            "cols": m + 1,
-            "row_labels": [""] + list(s1),
-            "col_labels": [""] + list(s2)
-        }
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized DP table of size ({n+1} x {m+1})",
+            data={
+                "rows": n + 1,
+                "cols": m + 1,
+                "row_labels": context_ref("row_labels"),
+                "col_labels": context_ref("col_labels")
+            },
+            context={"row_labels": [""] + list(s1), "col_labels": [""] + list(s2)}
+        )
     
     # Build DP Table
     for i in range(1, n + 1):
         for j in range(1, m + 1):
             
             # Highlight current comparison
-            steps.append(Step(
-                type=StepType.HIGHLIGHT,
-                description=f"Comparing '{s1[i-1]}' vs '{s2[j-1]}'",
-                data={"active_cell": {"r": i, "c": j}, "compare": [s1[i-1], s2[j-1]]}
-            ))
+            if record.cells:
+                yield record.step(
+                    type=StepType.HIGHLIGHT,
+                    template="lcs.compare", args=[s1[i-1], s2[j-1]],
+                    data={"active_cell": {"r": i, "c": j}, "compare": [s1[i-1], s2[j-1]]}
+                )
             
             if s1[i - 1] == s2[j - 1]:
                 val = dp[i - 1][j - 1] + 1
                 dp[i][j] = val
                 
-                steps.append(Step(
-                    type=StepType.UPDATE,
-                    description=f"Characters match! 1 + dp[{i-1}][{j-1}] = {val}",
-                    data={
-                        "cell": {"r": i, "c": j}, 
-                        "value": val,
-                        "highlight_prev": {"r": i-1, "c": j-1}
-                    }
-                ))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.UPDATE,
+                        template="lcs.match", args=[i-1, j-1, val],
+                        decisive=True,
+                        data={
+                            "cell": {"r": i, "c": j}, 
+                            "value": val,
+                            "highlight_prev": {"r": i-1, "c": j-1}
+                        }
+                    )
             else:
                 val1 = dp[i - 1][j]
                 val2 = dp[i][j - 1]
                 val = max(val1, val2)
                 dp[i][j] = val
                 
-                steps.append(Step(
-                    type=StepType.UPDATE,
-                    description=f"No match. max(dp[{i-1}][{j}] ({val1}), dp[{i}][{j-1}] ({val2})) = {val}",
-                    data={
-                        "cell": {"r": i, "c": j}, 
-                        "value": val,
-                        "highlight_prev": [{"r": i-1, "c": j}, {"r": i, "c": j-1}]
-                    }
-                ))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.UPDATE,
+                        template="lcs.no_match", args=[i-1, j, val1, i, j-1, val2, val],
+                        data={
+                            "cell": {"r": i, "c": j}, 
+                            "value": val,
+                            "highlight_prev": [{"r": i-1, "c": j}, {"r": i, "c": j-1}]
+                        }
+                    )
+
+        if record.rows:
+            yield record.step(
+                type=StepType.UPDATE,
+                description=f"Filled row {i} ('{s1[i-1]}'): LCS length so far {dp[i][m]}",
+                data={"i": i, "row": dp[i]}
+            )
     
     # Backtrack to find the LCS string
     lcs_algo = []
@@ -89,23 +122,211 @@ def solve_lcs_dp(data) -> AlgorithmResult:
     lcs_algo.reverse()
     result_str = "".join(lcs_algo)
     
-    steps.append(Step(
-        type=StepType.SOLUTION,
-        description=f"LCS Found: {result_str}",
-        data={"path": path, "lcs": result_str}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description=f"LCS Found: {result_str}",
+            data={"path": path, "lcs": result_str}
+        )
 
-    end_time = time.time()
-    
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=dp[n][m],
         result_text=result_str,
         selected_items=[],
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity=f"O({m}*{n})",
-            time_complexity=f"O({m}*{n})",
-            step_count=len(steps)
+        space_complexity=f"O({m}*{n})",
+        time_complexity=f"O({m}*{n})"
+    )
+
+def match_masks(b: str) -> Dict[str, int]:
+    """For every character of b, the bit set of the positions it occurs at (bit j for b[j])."""
+    masks: Dict[str, int] = {}
+    for j, ch in enumerate(b):
+        masks[ch] = masks.get(ch, 0) | 1 << j
+    return masks
+
+def lcs_bits(a: str, b: str) -> int:
+    """
+    Bit-parallel LCS (Allison-Dix, in Hyyrö's form): one row of the table
+    per few big-int operations. Bit j of the result is 0 where the last row
+    steps up between columns j and j+1, so dp[len(a)][j] is the number of 0
+    bits below bit j and the LCS length is the number of 0 bits in all.
+    """
+    masks = match_masks(b)
+    full = (1 << len(b)) - 1
+    bits = full
+    for ch in a:
+        matched = bits & masks.get(ch, 0)
+        bits = ((bits + matched) | (bits - matched)) & full
+    return bits
+
+def lcs_row(a: str, b: str) -> List[int]:
+    """Last row of the LCS table of a and b: the LCS length of a and b[:j] for every j, in O(len(b)) memory."""
+    if not b:
+        return [0]
+    steps = format(lcs_bits(a, b), f"0{len(b)}b")[::-1]
+    return [0, *accumulate(map("0".__eq__, steps))]
+
+def iter_lcs_hirschberg(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    """
+    LCS by Hirschberg's divide and conquer, in O(n + m) memory instead of the
+    full table. Text1's middle row is matched against the column where the
+    forward scores of its top half plus the backward scores of its bottom half
+    peak, which is where an LCS crosses that row. Both halves are then solved
+    the same way; a single row of text1 is a lookup. The row and full traces
+    show every split, the full trace also every character taken into the LCS.
+    """
+    record = TraceRecorder(detail)
+    s1 = data.text1
+    s2 = data.text2
+    n = len(s1)
+    m = len(s2)
+
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Solving ({n+1} x {m+1}) by splitting text1 in halves, two rows at a time",
+            data={
+                "rows": n + 1,
+                "cols": m + 1,
+                "row_labels": context_ref("row_labels"),
+                "col_labels": context_ref("col_labels")
+            },
+            context={"row_labels": [""] + list(s1), "col_labels": [""] + list(s2)}
+        )
+
+    # A prefix or suffix both texts share is part of an LCS as it is; only
+    # what lies between needs the splitting (usually a small part of two
+    # versions of a document)
+    shortest = min(n, m)
+    prefix = 0
+    while prefix < shortest and s1[prefix] == s2[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < shortest - prefix and s1[n - 1 - suffix] == s2[m - 1 - suffix]:
+        suffix += 1
+    if record.key and prefix + suffix:
+        yield record.step(
+            type=StepType.INFO,
+            description=f"Both texts start with the same {prefix} and end with the same {suffix} characters",
+            data={"prefix": prefix, "suffix": suffix}
+        )
+
+    traced = record.rows or record.cells
+    matches = [(k, k) for k in range(prefix)]
+    # Subproblems s1[r0:r1] x s2[c0:c1], left before right so the matches come out in order
+    pending = [(prefix, n - suffix, prefix, m - suffix)]
+    while pending:
+        r0, r1, c0, c1 = pending.pop()
+        if r0 == r1 or c0 == c1:
+            continue
+        if r1 - r0 == 1:
+            j = s2.find(s1[r0], c0, c1)
+            if j != -1:
+                matches.append((r0, j))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.UPDATE,
+                        template="lcs.take", args=[s1[r0], r0, j],
+                        decisive=True,
+                        data={"cell": {"r": r0 + 1, "c": j + 1}, "value": len(matches)}
+                    )
+            continue
+
+        mid = (r0 + r1) // 2
+        columns = s2[c0:c1]
+        forward = lcs_row(s1[r0:mid], columns)
+        backward = lcs_row(s1[mid:r1][::-1], columns[::-1])
+        width = c1 - c0
+        best, split = -1, 0
+        for k in range(width + 1):
+            score = forward[k] + backward[width - k]
+            if score > best:
+                best, split = score, k
+        split += c0
+
+        if traced:
+            yield record.step(
+                type=StepType.HIGHLIGHT,
+                template="lcs.split", args=[r0, r1, c0, c1, mid, split, best],
+                data={"cell": {"r": mid, "c": split}, "bounds": {"r": [r0, r1], "c": [c0, c1]}, "value": best}
+            )
+        pending.append((mid, r1, split, c1))
+        pending.append((r0, mid, c0, split))
+
+    matches.extend((n - suffix + k, m - suffix + k) for k in range(suffix))
+    result_str = "".join(s1[i] for i, _ in matches)
+
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description=f"LCS Found: {result_str}",
+            data={"path": [{"r": i + 1, "c": j + 1} for i, j in matches], "lcs": result_str}
+        )
+
+    return ResultSummary(
+        result_value=len(matches),
+        selected_items=[],
+        space_complexity=f"O({n}+{m})",
+        time_complexity=f"O({m}*{n})"
+    )
+
+def iter_lcs_bit_parallel(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    """
+    LCS length only, bit-parallel (see lcs_bits): each character of text1
+    updates a whole row of the table with a handful of big-int operations over
+    the match masks of text2, instead of one Python step per cell. For when
+    only the length (or a similarity score) is needed; the LCS itself takes
+    the table or Hirschberg. The row and full traces show each row's length.
+    """
+    record = TraceRecorder(detail)
+    s1 = data.text1
+    s2 = data.text2
+    n = len(s1)
+    m = len(s2)
+
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Computing the ({n+1} x {m+1}) table a row at a time, as the bits of one integer",
+            data={
+                "rows": n + 1,
+                "cols": m + 1,
+                "row_labels": context_ref("row_labels"),
+                "col_labels": context_ref("col_labels")
+            },
+            context={"row_labels": [""] + list(s1), "col_labels": [""] + list(s2)}
         )
+
+    if record.rows or record.cells:
+        masks = match_masks(s2)
+        full = (1 << m) - 1
+        bits = full
+        length = 0
+        for i, ch in enumerate(s1, 1):
+            matched = bits & masks.get(ch, 0)
+            bits = ((bits + matched) | (bits - matched)) & full
+            # Python 3.9 has no int.bit_count
+            grown = m - bin(bits).count("1")
+            yield record.step(
+                type=StepType.UPDATE,
+                template="lcs.bit_row", args=[i, ch, grown],
+                decisive=grown > length,
+                data={"i": i, "j": m, "value": grown}
+            )
+            length = grown
+    else:
+        length = m - bin(lcs_bits(s1, s2)).count("1")
+
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description=f"LCS Length: {length}",
+            data={"length": length}
+        )
+
+    return ResultSummary(
+        result_value=length,
+        selected_items=[],
+        space_complexity=f"O({m})",
+        time_complexity=f"O({n}*{m}/w)"
     )
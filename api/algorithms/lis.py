@@ -1,39 +1,53 @@
-import time
+from bisect import bisect_left
 from typing import List
-from api.models import Step, StepType, AlgorithmResult, Metrics
+from api.models import StepType, AlgorithmResult, ResultSummary, TraceDetail, TraceRecorder
+from api.descriptions import register_templates
+from api.context import context_ref
+from api.tracing import StepTrace, run_trace
 
-def solve_lis_dp(data) -> AlgorithmResult:
+register_templates({
+    "lis.compare": "Comparing arr[{0}]={1} with arr[{2}]={3}",
+    "lis.update": "arr[{0}]={1} < arr[{2}]={3}. Update dp[{2}] = dp[{0}] + 1 = {4}",
+    "lis.new_pile": "arr[{0}]={1} is larger than every pile top: start pile {2}",
+    "lis.place": "arr[{0}]={1} goes on pile {2}, replacing top {3}",
+})
+
+def solve_lis_dp(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_lis_dp(data, detail))
+
+def solve_lis_patience(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_lis_patience(data, detail))
+
+def iter_lis_dp(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
     """
-    Longest Increasing Subsequence - DP Solution with O(n log n) optimization using binary search.
+    Longest Increasing Subsequence - O(n²) DP Solution, comparing every pair
+    for the visualization. iter_lis_patience is the O(n log n) version.
     """
-    start_time = time.time()
-    steps = []
-    
+    record = TraceRecorder(detail)
     arr = data.sequence
     n = len(arr)
     
     if n == 0:
-        return AlgorithmResult(
-            steps=[Step(type=StepType.INFO, description="Empty sequence", data={})],
-            result_value=0,
-            selected_items=[],
-            metrics=Metrics(time_taken=0, space_complexity="O(1)", time_complexity="O(1)", step_count=1)
-        )
+        if record.key:
+            yield record.step(type=StepType.INFO, description="Empty sequence", data={})
+        return ResultSummary(result_value=0, selected_items=[], space_complexity="O(1)", time_complexity="O(1)")
     
     # dp[i] = length of LIS ending at index i
     dp = [1] * n
     parent = [-1] * n  # To reconstruct the sequence
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized DP array of size {n}. dp[i] = length of LIS ending at index i. All start at 1.",
-        data={
-            "array": arr,
-            "dp": dp.copy(),
-            "rows": 2,
-            "cols": n
-        }
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized DP array of size {n}. dp[i] = length of LIS ending at index i. All start at 1.",
+            data={
+                "array": context_ref("array"),
+                "dp": dp.copy(),
+                "rows": 2,
+                "cols": n
+            },
+            context={"array": arr}
+        )
     
     max_length = 1
     max_index = 0
@@ -41,53 +55,138 @@ def solve_lis_dp(data) -> AlgorithmResult:
     # Fill DP table - O(n^2) for visualization clarity
     for i in range(1, n):
         for j in range(i):
-            steps.append(Step(
-                type=StepType.HIGHLIGHT,
-                description=f"Comparing arr[{j}]={arr[j]} with arr[{i}]={arr[i]}",
-                data={"i": 0, "j": i, "compare_j": j, "arr_i": arr[i], "arr_j": arr[j]}
-            ))
+            if record.cells:
+                yield record.step(
+                    type=StepType.HIGHLIGHT,
+                    template="lis.compare", args=[j, arr[j], i, arr[i]],
+                    data={"i": 0, "j": i, "compare_j": j, "arr_i": arr[i], "arr_j": arr[j]}
+                )
             
             if arr[j] < arr[i] and dp[j] + 1 > dp[i]:
                 dp[i] = dp[j] + 1
                 parent[i] = j
                 
-                steps.append(Step(
-                    type=StepType.UPDATE,
-                    description=f"arr[{j}]={arr[j]} < arr[{i}]={arr[i]}. Update dp[{i}] = dp[{j}] + 1 = {dp[i]}",
-                    data={
-                        "i": 0, "j": i, "value": dp[i],
-                        "dp_array": dp.copy()
-                    }
-                ))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.UPDATE,
+                        template="lis.update", args=[j, arr[j], i, arr[i], dp[i]],
+                        decisive=True,
+                        data={
+                            "i": 0, "j": i, "value": dp[i],
+                            "dp_array": dp.copy()
+                        }
+                    )
+
+        if record.rows:
+            yield record.step(
+                type=StepType.UPDATE,
+                description=f"dp[{i}] = {dp[i]}: longest increasing subsequence ending at arr[{i}]={arr[i]}",
+                data={"i": 0, "j": i, "value": dp[i], "parent": parent[i]}
+            )
         
         if dp[i] > max_length:
             max_length = dp[i]
             max_index = i
     
     # Backtrack to find the LIS
-    lis = []
-    idx = max_index
-    while idx != -1:
-        lis.append(arr[idx])
-        idx = parent[idx]
-    lis.reverse()
-    
-    steps.append(Step(
-        type=StepType.SOLUTION,
-        description=f"LIS Length: {max_length}. Sequence: {lis}",
-        data={"length": max_length, "sequence": lis, "indices": [arr.index(x) for x in lis]}
-    ))
+    lis, indices = backtrack(arr, parent, max_index)
     
-    end_time = time.time()
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description=f"LIS Length: {max_length}. Sequence: {lis}",
+            data={"length": max_length, "sequence": lis, "indices": indices}
+        )
     
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=max_length,
         selected_items=lis,
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity="O(n)",
-            time_complexity="O(n²)",
-            step_count=len(steps)
+        space_complexity="O(n)",
+        time_complexity="O(n²)"
+    )
+
+def iter_lis_patience(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    """
+    Longest Increasing Subsequence - Patience sorting, O(n log n).
+    Each element goes on the leftmost pile whose top is >= it (binary search
+    over the pile tops, which stay sorted), or starts a new pile. The number
+    of piles is the LIS length, and linking every element to the top of the
+    pile before its own when it was placed gives an LIS ending at the last pile.
+    """
+    record = TraceRecorder(detail)
+    arr = data.sequence
+    n = len(arr)
+
+    if n == 0:
+        if record.key:
+            yield record.step(type=StepType.INFO, description="Empty sequence", data={})
+        return ResultSummary(result_value=0, selected_items=[], space_complexity="O(1)", time_complexity="O(1)")
+
+    tops: List[int] = []         # value on top of each pile, increasing
+    top_indices: List[int] = []  # index in arr of each pile's top
+    parent = [-1] * n
+
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Dealing {n} elements onto piles. Pile k holds candidates to end an increasing subsequence of length k.",
+            data={
+                "array": context_ref("array"),
+                "tops": [],
+                "rows": 2,
+                "cols": n
+            },
+            context={"array": arr}
         )
+
+    traced = record.rows or record.cells
+    for i, value in enumerate(arr):
+        pile = bisect_left(tops, value)
+        if pile:
+            parent[i] = top_indices[pile - 1]
+        grew = pile == len(tops)
+        if grew:
+            tops.append(value)
+            top_indices.append(i)
+        else:
+            replaced = tops[pile]
+            tops[pile] = value
+            top_indices[pile] = i
+
+        if traced:
+            # The pile an element lands on is the length of the LIS ending at it
+            # (dp[i]); the step means tops[pile - 1] = value
+            yield record.step(
+                type=StepType.UPDATE,
+                template="lis.new_pile" if grew else "lis.place",
+                args=[i, value, pile + 1] if grew else [i, value, pile + 1, replaced],
+                decisive=grew,
+                data={"i": 0, "j": i, "value": pile + 1, "pile": pile + 1}
+            )
+
+    # Follow the links back from the top of the last pile
+    lis, indices = backtrack(arr, parent, top_indices[-1])
+
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description=f"LIS Length: {len(tops)}. Sequence: {lis}",
+            data={"length": len(tops), "sequence": lis, "indices": indices, "tops": tops}
+        )
+
+    return ResultSummary(
+        result_value=len(tops),
+        selected_items=lis,
+        space_complexity="O(n)",
+        time_complexity="O(n log n)"
     )
+
+def backtrack(arr: List[int], parent: List[int], last: int):
+    """The subsequence ending at index `last` following parent links, and its indices."""
+    indices = []
+    idx = last
+    while idx != -1:
+        indices.append(idx)
+        idx = parent[idx]
+    indices.reverse()
+    return [arr[idx] for idx in indices], indices
@@ -0,0 +1,253 @@
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from api.etags import encoded_etag, etag_matches
+from api.trace_store import store_flag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Negotiated compression for the /solve routes.
+# Bodies smaller than COMPRESSION_MIN_BYTES go out as they are. Compressed
+# bodies are kept in an LRU cache keyed by the request (path, query, Accept,
+# body) and the chosen encoding, so repeated identical requests such as the
+# frontend presets are answered without re-running the solver or recompressing.
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+ZSTD_LEVEL = int(os.environ.get("ZSTD_LEVEL", 3))
+COMPRESSED_CACHE_MAX_BYTES = int(os.environ.get("COMPRESSED_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def _zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+
+# Server preference when the client rates several encodings equally
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+ENCODERS["gzip"] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _gzip_stream():
+    # wbits 31 writes a gzip header (with a zero mtime, like ENCODERS["gzip"])
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _zstd_stream():
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return compressor.compress, compressor.flush
+
+
+def _brotli_stream():
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    return compressor.process, compressor.finish
+
+
+# Incremental counterparts of ENCODERS for output that is produced in chunks:
+# each factory returns a (compress, flush) pair for one stream
+STREAM_ENCODERS: Dict[str, Callable[[], Tuple[Callable[[bytes], bytes], Callable[[], bytes]]]] = {}
+if zstandard is not None:
+    STREAM_ENCODERS["zstd"] = _zstd_stream
+if brotli is not None:
+    STREAM_ENCODERS["br"] = _brotli_stream
+STREAM_ENCODERS["gzip"] = _gzip_stream
+
+
+def iter_compressed(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compresses a stream of chunks as it goes; only the compressor's window is kept."""
+    compress, flush = STREAM_ENCODERS[encoding]()
+    for chunk in chunks:
+        compressed = compress(chunk)
+        if compressed:
+            yield compressed
+    yield flush()
+
+
+# Streaming and session routes are never buffered
+UNBUFFERED_SUFFIXES = ("/stream", "/live", "/ws")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks the best supported encoding from an Accept-Encoding header, honoring q-values."""
+    ranked: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name == "*":
+            for encoding in ENCODERS:
+                ranked.setdefault(encoding, quality)
+        elif name in ENCODERS:
+            ranked[name] = quality
+    best = None
+    for encoding in ENCODERS:
+        quality = ranked.get(encoding, 0.0)
+        if quality > 0 and (best is None or quality > ranked[best]):
+            best = encoding
+    return best
+
+
+class CompressedEntry:
+    def __init__(self, body: bytes, headers: List[Tuple[bytes, bytes]]):
+        self.body = body
+        self.headers = headers
+
+
+class CompressedCache:
+    def __init__(self, max_bytes: int = COMPRESSED_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, CompressedEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CompressedEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CompressedEntry):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key).body)
+            while self._entries and self.size + len(entry.body) > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self.size -= len(dropped.body)
+            self._entries[key] = entry
+            self.size += len(entry.body)
+
+
+compressed_cache = CompressedCache()
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware: buffers the response of a POST /solve route, compresses
+    it with the negotiated encoding when it is large enough, and caches the result.
+    Requests that store a trace (?store=true) are compressed but never cached,
+    since every one of them creates a new trace id. The route's ETag gets the
+    encoding appended (see api/etags.py), and a cached response whose ETag the
+    client already holds is answered with a 304.
+    """
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_BYTES, cache: Optional[CompressedCache] = None):
+        self.app = app
+        self.min_size = min_size
+        self.cache = cache if cache is not None else compressed_cache
+
+    def _applies(self, scope) -> bool:
+        path = scope["path"]
+        return scope["method"] == "POST" and "/solve/" in path and not path.endswith(UNBUFFERED_SUFFIXES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Read the request body up front: it is part of the cache key
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        request_body = b"".join(chunks)
+
+        # Read the way the route reads it: the last ?store= value decides
+        stored = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True).get("store")
+        cacheable = not (stored and store_flag(stored[-1]))
+        key = None
+        if cacheable:
+            digest = hashlib.blake2b(digest_size=20)
+            for part in (scope["path"].encode(), scope.get("query_string", b""), headers.get("accept", "").encode(), request_body):
+                digest.update(part)
+                digest.update(b"\0")
+            key = f"{encoding}:{digest.hexdigest()}"
+            entry = self.cache.get(key)
+            if entry is not None:
+                etag = Headers(raw=entry.headers).get("etag")
+                if etag is not None and etag_matches(headers.get("if-none-match"), etag):
+                    not_modified = [(b"etag", etag.encode()), (b"vary", b"Accept-Encoding")]
+                    await send({"type": "http.response.start", "status": 304, "headers": not_modified})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                await send({"type": "http.response.start", "status": 200, "headers": entry.headers})
+                await send({"type": "http.response.body", "body": entry.body})
+                return
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": request_body, "more_body": False}
+            return await receive()
+
+        start = None
+        body_parts = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+
+        await self.app(scope, replay, capture)
+        body = b"".join(body_parts)
+        response_headers = MutableHeaders(raw=list(start["headers"]))
+
+        if start["status"] != 200 or "content-encoding" in response_headers or len(body) < self.min_size:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        # Compressing megabytes of JSON takes a while; keep it off the event loop
+        body = await run_in_threadpool(ENCODERS[encoding], body)
+        response_headers["content-encoding"] = encoding
+        response_headers["content-length"] = str(len(body))
+        response_headers.add_vary_header("Accept-Encoding")
+        if "etag" in response_headers:
+            response_headers["etag"] = encoded_etag(response_headers["etag"], encoding)
+        if key is not None:
+            self.cache.put(key, CompressedEntry(body, response_headers.raw))
+        await send({"type": "http.response.start", "status": 200, "headers": response_headers.raw})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Iterable, List
+from api.models import Step
+
+# Shared trace context.
+# Large inputs a solver echoes into its steps (graphs, input text, label rows...)
+# are sent once per response under "context" instead of inside the step. The
+# step's data holds {"$ref": key} in their place, and the object it stands for
+# comes with the Step as its (unserialized) `context` dict. Resolving every ref
+# against the context gives back exactly the inline trace.
+CONTEXT_REF = "$ref"
+
+
+def context_ref(key: str) -> Dict[str, str]:
+    return {CONTEXT_REF: key}
+
+
+def collect_context(steps: Iterable[Step]) -> Dict[str, Any]:
+    context: Dict[str, Any] = {}
+    for step in steps:
+        if step.context:
+            context.update(step.context)
+    return context
+
+
+def resolve_context(steps: List[Step], context: Dict[str, Any]) -> List[Step]:
+    """Puts the referenced objects back into the steps' data, for consumers that want them inline."""
+    resolved = []
+    for step in steps:
+        refs = {key: value[CONTEXT_REF] for key, value in step.data.items() if isinstance(value, dict) and CONTEXT_REF in value}
+        if refs:
+            step = step.model_copy(update={"data": {**step.data, **{key: context[ref] for key, ref in refs.items()}}})
+        resolved.append(step)
+    return resolved
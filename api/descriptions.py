@@ -0,0 +1,23 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+# Deferred step descriptions.
+# Steps yielded from hot loops carry a template id and positional args instead
+# of a formatted description. The text is only produced when the step is
+# serialized (see Step.describe); clients that send ?descriptions=template get
+# the args as is, plus the template table once per response, and format them
+# when a step is actually shown.
+STEP_TEMPLATES: Dict[str, str] = {}
+
+
+def register_templates(templates: Dict[str, str]) -> Dict[str, str]:
+    STEP_TEMPLATES.update(templates)
+    return templates
+
+
+def render_description(template: str, args: Optional[List[Any]]) -> str:
+    return STEP_TEMPLATES[template].format(*(args or ()))
+
+
+def template_table(templates: Iterable[Optional[str]]) -> Dict[str, str]:
+    """The templates among the given ids, for the once-per-response table."""
+    return {template: STEP_TEMPLATES[template] for template in sorted(set(templates) - {None})}
@@ -0,0 +1,271 @@
+import time
+from typing import Any, Dict, Iterator, List
+from pydantic_core import to_json
+from api.models import AlgorithmResult, Metrics, Step, StepType
+from api.tracing import StepTrace, build_metrics
+
+# Columnar (struct-of-arrays) trace layout.
+# Instead of a list of step objects, every step attribute becomes one array:
+#   type        -> small integer codes into STEP_TYPES
+#   description -> list of strings
+#   columns     -> one array per integer data field shared by many steps (null when absent)
+#   sparse      -> side table for rare / non-integer fields, keyed by step index
+COLUMNAR_MEDIA_TYPE = "application/vnd.algoverse.columnar+json"
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Binary transports, chosen through the Accept header. Each is only offered
+# when its codec is installed; otherwise the client gets JSON as usual.
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+CBOR_MEDIA_TYPE = "application/cbor"
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover
+    cbor2 = None
+
+BINARY_CODECS = {}
+if msgpack is not None:
+    BINARY_CODECS[MSGPACK_MEDIA_TYPE] = msgpack.packb
+if cbor2 is not None:
+    BINARY_CODECS[CBOR_MEDIA_TYPE] = cbor2.dumps
+
+# Other names clients use for the same formats
+BINARY_MEDIA_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+# Steps are flushed to the client in chunks of this many lines; the first step
+# always goes out on its own so the visualizer can start drawing immediately.
+NDJSON_CHUNK_STEPS = 64
+
+STEP_TYPES = [t.value for t in StepType]
+STEP_TYPE_CODES = {t: code for code, t in enumerate(StepType)}
+
+# Compact (binary) trace layout: every step is a [type code, description, data]
+# array, and top level data keys found in FIELD_KEYS are replaced by their index
+# (nested dicts keep their, mostly one letter, keys). Codes are part of the wire
+# format: only ever append to this list.
+FIELD_KEYS = [
+    "i", "j", "value", "cell", "active_cell", "compare", "highlight_prev",
+    "rows", "cols", "action", "prev_i", "prev_j", "prev_j_include", "prev_j_exclude",
+    "operation", "choices", "k", "cost", "split", "item_id", "weight", "ratio",
+    "current_weight", "total_value", "u", "v", "current_node", "current_dist",
+    "checking_neighbor", "edge_weight", "node", "new_dist", "distances", "visited",
+    "mst_edges", "relaxed", "cut", "cut_length", "coin_used", "compare_j", "arr_i",
+    "arr_j", "dp_array", "parent", "row", "cells", "length", "delta",
+]
+FIELD_KEY_CODES = {name: code for code, name in enumerate(FIELD_KEYS)}
+
+# A data field becomes a dense column only if it is an integer everywhere
+# and present in at least this fraction of the steps.
+COLUMN_MIN_FILL = 0.125
+
+
+def _is_int(value: Any) -> bool:
+    return type(value) is int
+
+
+def _flatten(data: Dict[str, Any]) -> Dict[str, Any]:
+    # One level of nesting is common (e.g. LCS "cell": {"r": i, "c": j}),
+    # so integer-only sub dicts are flattened into dotted field names.
+    if not any(isinstance(value, dict) for value in data.values()):
+        return data
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict) and value and all(_is_int(v) for v in value.values()):
+            for sub_key, sub_value in value.items():
+                flat[f"{key}.{sub_key}"] = sub_value
+        else:
+            flat[key] = value
+    return flat
+
+
+def _unflatten(flat: Dict[str, Any]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    for key, value in flat.items():
+        if "." in key:
+            key, sub_key = key.split(".", 1)
+            data.setdefault(key, {})[sub_key] = value
+        else:
+            data[key] = value
+    return data
+
+
+def encode_steps_columnar(steps: List[Step], templates: bool = False) -> Dict[str, Any]:
+    count = len(steps)
+    flat_data = [_flatten(step.data) for step in steps]
+
+    # Pick dense columns: integer fields that show up often enough
+    occurrences: Dict[str, int] = {}
+    non_int = set()
+    for data in flat_data:
+        for key, value in data.items():
+            occurrences[key] = occurrences.get(key, 0) + 1
+            if type(value) is not int:
+                non_int.add(key)
+    min_fill = max(1, int(count * COLUMN_MIN_FILL))
+    column_keys = [key for key, seen in occurrences.items() if key not in non_int and seen >= min_fill]
+
+    columns: Dict[str, List[Any]] = {key: [None] * count for key in column_keys}
+    sparse_index = []
+    sparse_data = []
+    for index, data in enumerate(flat_data):
+        rest = {}
+        for key, value in data.items():
+            column = columns.get(key)
+            if column is not None:
+                column[index] = value
+            else:
+                rest[key] = value
+        if rest:
+            sparse_index.append(index)
+            sparse_data.append(_unflatten(rest))
+
+    payload = {
+        "encoding": "columnar",
+        "count": count,
+        "types": STEP_TYPES,
+        "type": [STEP_TYPE_CODES[step.type] for step in steps],
+        "description": [step.description for step in steps],
+        "columns": columns,
+        "sparse": {"index": sparse_index, "data": sparse_data},
+    }
+    if templates:
+        # Deferred descriptions stay as template + args, description is null for those steps
+        payload["description"] = [None if step.template is not None else step.description for step in steps]
+        payload["template"] = [step.template for step in steps]
+        payload["args"] = [step.args for step in steps]
+    return payload
+
+
+def decode_steps_columnar(payload: Dict[str, Any]) -> List[Step]:
+    types = payload["types"]
+    columns = payload["columns"]
+    templates = payload.get("template")
+    args = payload.get("args")
+    sparse = dict(zip(payload["sparse"]["index"], payload["sparse"]["data"]))
+    steps = []
+    for index in range(payload["count"]):
+        flat = {key: column[index] for key, column in columns.items() if column[index] is not None}
+        data = _unflatten(flat)
+        for key, value in sparse.get(index, {}).items():
+            if isinstance(value, dict) and isinstance(data.get(key), dict):
+                data[key].update(value)
+            else:
+                data[key] = value
+        steps.append(Step(
+            type=types[payload["type"][index]],
+            description=payload["description"][index] or "",
+            data=data,
+            template=templates[index] if templates else None,
+            args=args[index] if args else None
+        ))
+    return steps
+
+
+def to_columnar(result: AlgorithmResult, templates: bool = False) -> Dict[str, Any]:
+    payload = result.model_dump(exclude={"steps"})
+    payload["steps"] = encode_steps_columnar(result.steps, templates)
+    return payload
+
+
+def to_compact(result: AlgorithmResult, templates: bool = False) -> Dict[str, Any]:
+    payload = result.model_dump(exclude={"steps"})
+    codes = FIELD_KEY_CODES
+    steps = []
+    for step in result.steps:
+        data = {codes.get(key, key): value for key, value in step.data.items()}
+        if templates and step.template is not None:
+            steps.append([STEP_TYPE_CODES[step.type], None, data, step.template, step.args])
+        else:
+            steps.append([STEP_TYPE_CODES[step.type], step.description, data])
+    payload["steps"] = {"encoding": "compact", "types": STEP_TYPES, "keys": FIELD_KEYS, "items": steps}
+    return payload
+
+
+def from_compact(payload: Dict[str, Any]) -> AlgorithmResult:
+    fields = {key: value for key, value in payload.items() if key != "steps"}
+    fields["metrics"] = Metrics(**fields["metrics"])
+    types = payload["steps"]["types"]
+    steps = []
+    for item in payload["steps"]["items"]:
+        steps.append(Step(
+            type=types[item[0]],
+            description=item[1] or "",
+            data={FIELD_KEYS[key] if type(key) is int else key: value for key, value in item[2].items()},
+            template=item[3] if len(item) > 3 else None,
+            args=item[4] if len(item) > 4 else None
+        ))
+    return AlgorithmResult(steps=steps, **fields)
+
+
+def pack(payload: Any, media_type: str) -> bytes:
+    return BINARY_CODECS[media_type](payload)
+
+
+def unpack(body: bytes, media_type: str) -> Any:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        # Field codes are integer map keys, which msgpack only allows on request
+        return msgpack.unpackb(body, strict_map_key=False)
+    return cbor2.loads(body)
+
+
+def dump_steps(steps: List[Step], templates: bool = False) -> List[Dict[str, Any]]:
+    """Steps as plain dicts; with templates=True deferred descriptions stay as template + args."""
+    if not templates:
+        return [step.model_dump() for step in steps]
+    dumped = []
+    for step in steps:
+        if step.template is None:
+            dumped.append({"type": step.type, "description": step.description, "data": step.data})
+        else:
+            dumped.append({"type": step.type, "template": step.template, "args": step.args, "data": step.data})
+    return dumped
+
+
+def from_columnar(payload: Dict[str, Any]) -> AlgorithmResult:
+    fields = {key: value for key, value in payload.items() if key != "steps"}
+    fields["metrics"] = Metrics(**fields["metrics"])
+    return AlgorithmResult(steps=decode_steps_columnar(payload["steps"]), **fields)
+
+
+def iter_ndjson(trace: StepTrace) -> Iterator[bytes]:
+    """
+    Encodes a running solver as newline-delimited JSON.
+    One line per step, in order, followed by a final {"result": {...}} line
+    carrying result_value, selected_items and metrics. Shared context entries
+    go out as a {"context": {...}} line just before the first step using them.
+    Only the current chunk of steps is ever held in memory.
+    """
+    start_time = time.time()
+    step_count = 0
+    chunk = []
+    while True:
+        try:
+            step = next(trace)
+        except StopIteration as stop:
+            summary = stop.value
+            break
+        if step.context:
+            chunk.append(to_json({"context": step.context}, inf_nan_mode="null").decode())
+        chunk.append(step.render().model_dump_json())
+        step_count += 1
+        if step_count == 1 or len(chunk) >= NDJSON_CHUNK_STEPS:
+            yield ("\n".join(chunk) + "\n").encode()
+            chunk = []
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode()
+
+    result = {
+        "result_value": summary.result_value,
+        "selected_items": summary.selected_items,
+        "metrics": build_metrics(summary, time.time() - start_time, step_count).model_dump(),
+    }
+    yield to_json({"result": result}, inf_nan_mode="null") + b"\n"
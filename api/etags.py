@@ -0,0 +1,37 @@
+from typing import Optional
+
+# Entity tags for the /solve routes.
+# A result is a pure function of the request, so its tag is the result cache
+# key (input hash, options, representation and engine version): a route can
+# answer If-None-Match with a 304 before running the solver. When the
+# compression middleware encodes a body it appends the encoding to the tag
+# ("<key>-gzip"), keeping it strong and distinct per representation as on the
+# wire; matching ignores that suffix, since every encoding of a result is
+# current as long as its key is.
+
+
+def make_etag(key: str) -> str:
+    return f'"{key}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _opaque_key(tag: str) -> str:
+    # W/"<key>-<encoding>" -> <key>
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    return tag.strip('"').partition("-")[0]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names `etag` (weak comparison, any encoding of it)."""
+    if not if_none_match:
+        return False
+    key = _opaque_key(etag)
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or _opaque_key(tag) == key:
+            return True
+    return False
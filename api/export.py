@@ -0,0 +1,63 @@
+from typing import BinaryIO, Iterable, Iterator, Union
+from pydantic_core import to_json
+from api.compression import STREAM_ENCODERS, iter_compressed
+from api.encoding import NDJSON_CHUNK_STEPS, NDJSON_MEDIA_TYPE, iter_ndjson
+from api.trace_store import StoredTrace
+from api.tracing import StepTrace
+
+# Trace archives: the NDJSON layout of the streaming routes (see
+# encoding.iter_ndjson), compressed chunk by chunk. Neither a stored trace nor a
+# running solver is ever turned into one big document; at most one chunk of
+# steps plus the compressor's window is held at a time.
+# compression -> (file extension, media type)
+EXPORT_FORMATS = {
+    "gzip": (".gz", "application/gzip"),
+    "zstd": (".zst", "application/zstd"),
+    "br": (".br", "application/x-brotli"),
+    "none": ("", NDJSON_MEDIA_TYPE),
+}
+DEFAULT_EXPORT_COMPRESSION = "gzip"
+
+
+def export_formats() -> Iterable[str]:
+    """The compressions usable here: "none" plus whatever encoders are installed."""
+    return [name for name in EXPORT_FORMATS if name == "none" or name in STREAM_ENCODERS]
+
+
+def iter_stored_ndjson(stored: StoredTrace) -> Iterator[bytes]:
+    """A stored trace as NDJSON: its context first, then the steps, then the result line."""
+    context = stored.summary.get("context")
+    if context:
+        yield to_json({"context": context}, inf_nan_mode="null") + b"\n"
+    for start in range(0, len(stored.steps), NDJSON_CHUNK_STEPS):
+        yield b"\n".join(stored.steps[start:start + NDJSON_CHUNK_STEPS]) + b"\n"
+    result = {key: stored.summary[key] for key in ("result_value", "selected_items", "metrics")}
+    yield to_json({"result": result}, inf_nan_mode="null") + b"\n"
+
+
+def iter_export(chunks: Iterable[bytes], compression: str = DEFAULT_EXPORT_COMPRESSION) -> Iterator[bytes]:
+    if compression not in export_formats():
+        raise ValueError(f"Unsupported compression {compression!r}, expected one of {', '.join(export_formats())}")
+    if compression == "none":
+        return iter(chunks)
+    return iter_compressed(chunks, compression)
+
+
+def export_trace(trace: StepTrace, target: Union[str, BinaryIO], compression: str = DEFAULT_EXPORT_COMPRESSION) -> int:
+    """
+    Runs a solver straight into an archive file (a path or a binary file object)
+    and returns the number of bytes written.
+    """
+    chunks = iter_export(iter_ndjson(trace), compression)
+    if isinstance(target, str):
+        with open(target, "wb") as output:
+            return _write(chunks, output)
+    return _write(chunks, target)
+
+
+def _write(chunks: Iterable[bytes], output: BinaryIO) -> int:
+    written = 0
+    for chunk in chunks:
+        output.write(chunk)
+        written += len(chunk)
+    return written
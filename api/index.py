@@ -1,27 +1,53 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from fastapi import Body, FastAPI, HTTPException, Query, Request, WebSocket
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from pydantic_core import to_json
 from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
 
 # Import algorithm modules from api folder
-from api.algorithms.knapsack import solve_knapsack_dp, solve_knapsack_greedy
-from api.algorithms.coin_change import solve_coin_change_dp, solve_coin_change_greedy
-from api.algorithms.interval_scheduling import solve_interval_scheduling_greedy, solve_interval_scheduling_dp
-from api.algorithms.matrix_chain import solve_matrix_chain_dp
-from api.algorithms.huffman import solve_huffman
-from api.algorithms.lcs import solve_lcs_dp
-from api.algorithms.dijkstra import solve_dijkstra
-from api.algorithms.prims import solve_prims
-from api.algorithms.kruskals import solve_kruskals
-from api.algorithms.edit_distance import solve_edit_distance_dp
-from api.algorithms.lis import solve_lis_dp
-from api.algorithms.rod_cutting import solve_rod_cutting_dp
+from api.algorithms.knapsack import iter_knapsack_dp, iter_knapsack_greedy
+from api.algorithms.coin_change import iter_coin_change_dp, iter_coin_change_greedy
+from api.algorithms.interval_scheduling import iter_interval_scheduling_greedy, iter_interval_scheduling_dp
+from api.algorithms.matrix_chain import iter_matrix_chain_dp
+from api.algorithms.huffman import iter_huffman
+from api.algorithms.lcs import iter_lcs_bit_parallel, iter_lcs_dp, iter_lcs_hirschberg
+from api.algorithms.dijkstra import iter_dijkstra
+from api.algorithms.prims import iter_prims
+from api.algorithms.kruskals import iter_kruskals
+from api.algorithms.edit_distance import iter_edit_distance_dp
+from api.algorithms.lis import iter_lis_dp, iter_lis_patience
+from api.algorithms.rod_cutting import iter_rod_cutting_dp
+from api.algorithms import get_solver
+from api.compare import compare_traces
+from api.compression import CompressionMiddleware
+from api.export import DEFAULT_EXPORT_COMPRESSION, EXPORT_FORMATS, iter_export, iter_stored_ndjson
+from api.live import DEFAULT_LIVE_WINDOW, LIVE_SESSIONS, iter_sse, open_session, serve_websocket
+from api.presets import PRECOMPUTE_PRESETS, precompute_presets
+from api.responses import render_result, stream_result
+from api.result_cache import result_cache
+from api.sessions import SessionTooLarge, edit_session, new_session, session_state, session_store
+from api.snapshots import DEFAULT_KEYFRAME_INTERVAL, delta_trace
+from api.trace_store import DEFAULT_PAGE_STEPS, MAX_PAGE_STEPS, trace_store
 from api.models import (
-    AlgorithmType, AlgorithmResult, KnapsackInput, CoinChangeInput, 
-    IntervalSchedulingInput, MatrixChainInput, HuffmanInput, LCSInput, 
-    DijkstraInput, EditDistanceInput, LISInput, RodCuttingInput
+    AlgorithmType, AlgorithmResult, SessionState, SnapshotMode, StepType, TraceDetail, TraceDiff, TraceSummary, KnapsackInput, CoinChangeInput, 
+    IntervalSchedulingInput, MatrixChainInput, HuffmanInput, LCSInput, LCSMethod,
+    DijkstraInput, EditDistanceInput, LISInput, LISMethod, RodCuttingInput
 )
 
-app = FastAPI(title="Algorithm Visualizer API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fill the result cache with the frontend's preset inputs (see api/presets.py)
+    app.state.presets = await precompute_presets(app) if PRECOMPUTE_PRESETS else None
+    yield
+
+app = FastAPI(title="Algorithm Visualizer API", lifespan=lifespan)
+
+# Added before CORS so it sits inside it: cached responses still get CORS headers per request
+app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,70 +62,351 @@ def read_root():
     return {"message": "Algorithm Visualizer API"}
 
 @app.post("/solve/knapsack/{algorithm_type}", response_model=AlgorithmResult)
-def solve_knapsack(algorithm_type: str, data: KnapsackInput):
+def solve_knapsack(algorithm_type: str, data: KnapsackInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
     if algorithm_type == AlgorithmType.DP:
-        return solve_knapsack_dp(data)
+        return render_result(iter_knapsack_dp(data, detail), request, data)
     elif algorithm_type == AlgorithmType.GREEDY:
-        return solve_knapsack_greedy(data)
+        return render_result(iter_knapsack_greedy(data, detail), request, data)
     else:
         raise HTTPException(status_code=400, detail=f"Unknown algorithm type: {algorithm_type}")
 
 @app.post("/solve/coin-change/{algorithm_type}", response_model=AlgorithmResult)
-def solve_coin_change(algorithm_type: str, data: CoinChangeInput):
+def solve_coin_change(algorithm_type: str, data: CoinChangeInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
     if algorithm_type == AlgorithmType.DP:
-        return solve_coin_change_dp(data)
+        return render_result(iter_coin_change_dp(data, detail), request, data)
     elif algorithm_type == AlgorithmType.GREEDY:
-        return solve_coin_change_greedy(data)
+        return render_result(iter_coin_change_greedy(data, detail), request, data)
     else:
         raise HTTPException(status_code=400, detail=f"Unknown algorithm type: {algorithm_type}")
 
 @app.post("/solve/interval-scheduling/{algorithm_type}", response_model=AlgorithmResult)
-def solve_interval_scheduling(algorithm_type: str, data: IntervalSchedulingInput):
+def solve_interval_scheduling(algorithm_type: str, data: IntervalSchedulingInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
     if algorithm_type == AlgorithmType.DP:
-        return solve_interval_scheduling_dp(data)
+        return render_result(iter_interval_scheduling_dp(data, detail), request, data)
     elif algorithm_type == AlgorithmType.GREEDY:
-        return solve_interval_scheduling_greedy(data)
+        return render_result(iter_interval_scheduling_greedy(data, detail), request, data)
     else:
         raise HTTPException(status_code=400, detail=f"Unknown algorithm type: {algorithm_type}")
 
 @app.post("/solve/matrix-chain/{algorithm_type}", response_model=AlgorithmResult)
-def solve_matrix_chain(algorithm_type: str, data: MatrixChainInput):
+def solve_matrix_chain(algorithm_type: str, data: MatrixChainInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
     if algorithm_type == AlgorithmType.DP:
-        return solve_matrix_chain_dp(data)
+        return render_result(iter_matrix_chain_dp(data, detail), request, data)
     else:
         raise HTTPException(status_code=400, detail="Matrix Chain optimization is a DP problem.")
 
 @app.post("/solve/huffman", response_model=AlgorithmResult)
-def solve_huffman_endpoint(data: HuffmanInput):
-    return solve_huffman(data)
+def solve_huffman_endpoint(data: HuffmanInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return render_result(iter_huffman(data, detail), request, data)
 
 @app.post("/solve/lcs", response_model=AlgorithmResult)
-def solve_lcs_endpoint(data: LCSInput):
-    return solve_lcs_dp(data)
+def solve_lcs_endpoint(data: LCSInput, request: Request, detail: TraceDetail = TraceDetail.FULL, method: LCSMethod = LCSMethod.TABLE):
+    # ?method=hirschberg keeps memory linear, for texts too long for the table;
+    # ?method=bit-parallel is the fastest when only the length is needed
+    if method == LCSMethod.HIRSCHBERG:
+        return render_result(iter_lcs_hirschberg(data, detail), request, data)
+    if method == LCSMethod.BIT_PARALLEL:
+        return render_result(iter_lcs_bit_parallel(data, detail), request, data)
+    return render_result(iter_lcs_dp(data, detail), request, data)
 
 @app.post("/solve/dijkstra", response_model=AlgorithmResult)
-def solve_dijkstra_endpoint(data: DijkstraInput):
-    return solve_dijkstra(data)
+def solve_dijkstra_endpoint(data: DijkstraInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return render_result(iter_dijkstra(data, detail), request, data)
 
 @app.post("/solve/prims", response_model=AlgorithmResult)
-def solve_prims_endpoint(data: DijkstraInput):
-    return solve_prims(data)
+def solve_prims_endpoint(data: DijkstraInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return render_result(iter_prims(data, detail), request, data)
 
 @app.post("/solve/kruskals", response_model=AlgorithmResult)
-def solve_kruskals_endpoint(data: DijkstraInput):
-    return solve_kruskals(data)
+def solve_kruskals_endpoint(data: DijkstraInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return render_result(iter_kruskals(data, detail), request, data)
 
 @app.post("/solve/edit-distance", response_model=AlgorithmResult)
-def solve_edit_distance_endpoint(data: EditDistanceInput):
-    return solve_edit_distance_dp(data)
+def solve_edit_distance_endpoint(data: EditDistanceInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return render_result(iter_edit_distance_dp(data, detail), request, data)
 
 @app.post("/solve/lis", response_model=AlgorithmResult)
-def solve_lis_endpoint(data: LISInput):
-    return solve_lis_dp(data)
+def solve_lis_endpoint(data: LISInput, request: Request, detail: TraceDetail = TraceDetail.FULL, method: LISMethod = LISMethod.DP):
+    # ?method=patience is the O(n log n) engine, for long sequences
+    if method == LISMethod.PATIENCE:
+        return render_result(iter_lis_patience(data, detail), request, data)
+    return render_result(iter_lis_dp(data, detail), request, data)
 
 @app.post("/solve/rod-cutting", response_model=AlgorithmResult)
-def solve_rod_cutting_endpoint(data: RodCuttingInput):
-    return solve_rod_cutting_dp(data)
+def solve_rod_cutting_endpoint(data: RodCuttingInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return render_result(iter_rod_cutting_dp(data, detail), request, data)
+
+@app.post("/compare/{problem}", response_model=TraceDiff)
+def compare_algorithms(problem: str, body: Dict[str, Any] = Body(...), left: AlgorithmType = AlgorithmType.GREEDY,
+                       right: AlgorithmType = AlgorithmType.DP, detail: TraceDetail = TraceDetail.FULL):
+    """
+    Runs two algorithms for the same problem and input and returns only how
+    they differ (see api/compare.py), instead of both full traces.
+    """
+    try:
+        input_model, make_left = get_solver(problem, left)
+        _, make_right = get_solver(problem, right)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown problem: {problem}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        data = input_model.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return compare_traces(problem, left, make_left(data, detail), right, make_right(data, detail))
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    stats = result_cache.stats()
+    stats["presets"] = getattr(app.state, "presets", None)
+    return stats
+
+# Stored traces (POST /solve/...?store=true)
+@app.get("/traces/{trace_id}", response_model=TraceSummary)
+def get_trace(trace_id: str):
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    return TraceSummary(trace_id=trace.id, **trace.summary)
+
+@app.get("/traces/{trace_id}/steps")
+def get_trace_steps(trace_id: str, offset: int = 0, limit: int = DEFAULT_PAGE_STEPS):
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    offset = max(0, offset)
+    limit = max(0, min(limit, MAX_PAGE_STEPS))
+    body = b'{"trace_id":"%s","offset":%d,"limit":%d,"total":%d,"steps":%s}' % (
+        trace.id.encode(), offset, limit, len(trace.steps), trace.page(offset, limit)
+    )
+    return Response(body, media_type="application/json")
+
+@app.get("/traces/{trace_id}/state")
+def get_trace_state(trace_id: str, step: int):
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    if not 0 <= step < len(trace.steps):
+        raise HTTPException(status_code=400, detail=f"step must be between 0 and {len(trace.steps) - 1}")
+    keyframe, state = trace.state_at(step)
+    body = to_json({"trace_id": trace.id, "step": step, "keyframe": keyframe, "state": state.snapshot()}, inf_nan_mode="null")
+    return Response(body, media_type="application/json")
+
+@app.get("/traces/{trace_id}/query")
+def query_trace_steps(
+    trace_id: str,
+    types: Optional[List[StepType]] = Query(None, alias="type"),
+    i: Optional[int] = None,
+    j: Optional[int] = None,
+    nodes: Optional[List[str]] = Query(None, alias="node"),
+    edges: Optional[List[str]] = Query(None, alias="edge", description="u,v (undirected)"),
+    offset: int = 0,
+    limit: int = DEFAULT_PAGE_STEPS,
+):
+    """
+    Steps of a stored trace matching every filter: step type(s), DP cell (i, j)
+    (row updates of row i included), graph node(s), edge(s). Repeating a filter
+    matches any of its values. Answered from the trace's index, without a scan.
+    """
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    if (i is None) != (j is None):
+        raise HTTPException(status_code=400, detail="i and j must be given together")
+    edge_pairs = []
+    for edge in edges or []:
+        u, separator, v = edge.partition(",")
+        if not separator:
+            raise HTTPException(status_code=400, detail=f"edge must be 'u,v', got {edge!r}")
+        edge_pairs.append((u, v))
+    matches = trace.index.query(
+        types=types,
+        cell=None if i is None else (i, j),
+        nodes=nodes,
+        edges=edge_pairs,
+    )
+    offset = max(0, offset)
+    limit = max(0, min(limit, MAX_PAGE_STEPS))
+    numbers = matches[offset:offset + limit]
+    body = b'{"trace_id":"%s","offset":%d,"limit":%d,"total":%d,"indices":%s,"steps":%s}' % (
+        trace.id.encode(), offset, limit, len(matches), to_json(list(numbers)), trace.select(numbers)
+    )
+    return Response(body, media_type="application/json")
+
+@app.get("/traces/{trace_id}/export")
+def export_trace_steps(trace_id: str, compression: str = DEFAULT_EXPORT_COMPRESSION):
+    """Downloads a stored trace as an NDJSON archive, compressed as it is sent (see api/export.py)."""
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    try:
+        chunks = iter_export(iter_stored_ndjson(trace), compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    extension, media_type = EXPORT_FORMATS[compression]
+    filename = f"trace-{trace.id}.ndjson{extension}"
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# Incremental DP sessions: the table is kept between edits (see api/sessions.py)
+@app.post("/sessions/{problem}", response_model=SessionState)
+def create_session(problem: str, body: Dict[str, Any] = Body(...), rows: bool = True):
+    try:
+        return new_session(problem, body, rows)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No sessions for problem: {problem}")
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@app.get("/sessions/{session_id}", response_model=SessionState)
+def get_session(session_id: str, rows: bool = True):
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session_state(session, rows)
+
+@app.post("/sessions/{session_id}/edits", response_model=SessionState)
+def edit_session_endpoint(session_id: str, body: Dict[str, Any] = Body(...), rows: bool = True):
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    try:
+        return edit_session(session, body, rows)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SessionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@app.delete("/sessions/{session_id}", status_code=204)
+def delete_session(session_id: str):
+    if not session_store.remove(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return Response(status_code=204)
+
+# Streaming variants: same inputs, steps are sent as NDJSON while the solver runs
+@app.post("/solve/knapsack/{algorithm_type}/stream")
+def stream_knapsack(algorithm_type: str, data: KnapsackInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    if algorithm_type == AlgorithmType.DP:
+        return stream_result(iter_knapsack_dp(data, detail), request)
+    elif algorithm_type == AlgorithmType.GREEDY:
+        return stream_result(iter_knapsack_greedy(data, detail), request)
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown algorithm type: {algorithm_type}")
+
+@app.post("/solve/coin-change/{algorithm_type}/stream")
+def stream_coin_change(algorithm_type: str, data: CoinChangeInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    if algorithm_type == AlgorithmType.DP:
+        return stream_result(iter_coin_change_dp(data, detail), request)
+    elif algorithm_type == AlgorithmType.GREEDY:
+        return stream_result(iter_coin_change_greedy(data, detail), request)
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown algorithm type: {algorithm_type}")
+
+@app.post("/solve/interval-scheduling/{algorithm_type}/stream")
+def stream_interval_scheduling(algorithm_type: str, data: IntervalSchedulingInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    if algorithm_type == AlgorithmType.DP:
+        return stream_result(iter_interval_scheduling_dp(data, detail), request)
+    elif algorithm_type == AlgorithmType.GREEDY:
+        return stream_result(iter_interval_scheduling_greedy(data, detail), request)
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown algorithm type: {algorithm_type}")
+
+@app.post("/solve/matrix-chain/{algorithm_type}/stream")
+def stream_matrix_chain(algorithm_type: str, data: MatrixChainInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    if algorithm_type == AlgorithmType.DP:
+        return stream_result(iter_matrix_chain_dp(data, detail), request)
+    else:
+        raise HTTPException(status_code=400, detail="Matrix Chain optimization is a DP problem.")
+
+@app.post("/solve/huffman/stream")
+def stream_huffman_endpoint(data: HuffmanInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return stream_result(iter_huffman(data, detail), request)
+
+@app.post("/solve/lcs/stream")
+def stream_lcs_endpoint(data: LCSInput, request: Request, detail: TraceDetail = TraceDetail.FULL, method: LCSMethod = LCSMethod.TABLE):
+    if method == LCSMethod.HIRSCHBERG:
+        return stream_result(iter_lcs_hirschberg(data, detail), request)
+    if method == LCSMethod.BIT_PARALLEL:
+        return stream_result(iter_lcs_bit_parallel(data, detail), request)
+    return stream_result(iter_lcs_dp(data, detail), request)
+
+@app.post("/solve/dijkstra/stream")
+def stream_dijkstra_endpoint(data: DijkstraInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return stream_result(iter_dijkstra(data, detail), request)
+
+@app.post("/solve/prims/stream")
+def stream_prims_endpoint(data: DijkstraInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return stream_result(iter_prims(data, detail), request)
+
+@app.post("/solve/kruskals/stream")
+def stream_kruskals_endpoint(data: DijkstraInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return stream_result(iter_kruskals(data, detail), request)
+
+@app.post("/solve/edit-distance/stream")
+def stream_edit_distance_endpoint(data: EditDistanceInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return stream_result(iter_edit_distance_dp(data, detail), request)
+
+@app.post("/solve/lis/stream")
+def stream_lis_endpoint(data: LISInput, request: Request, detail: TraceDetail = TraceDetail.FULL, method: LISMethod = LISMethod.DP):
+    if method == LISMethod.PATIENCE:
+        return stream_result(iter_lis_patience(data, detail), request)
+    return stream_result(iter_lis_dp(data, detail), request)
+
+@app.post("/solve/rod-cutting/stream")
+def stream_rod_cutting_endpoint(data: RodCuttingInput, request: Request, detail: TraceDetail = TraceDetail.FULL):
+    return stream_result(iter_rod_cutting_dp(data, detail), request)
+
+# Live traces with client flow control (see api/live.py for the protocol)
+@app.websocket("/solve/{problem}/ws")
+@app.websocket("/solve/{problem}/{algorithm_type}/ws")
+async def live_trace_websocket(websocket: WebSocket, problem: str, algorithm_type: Optional[str] = None):
+    try:
+        input_model, make_trace = get_solver(problem, algorithm_type)
+    except (KeyError, ValueError):
+        await websocket.close(code=1008)
+        return
+    await serve_websocket(websocket, input_model, make_trace)
+
+@app.post("/solve/{problem}/live")
+@app.post("/solve/{problem}/{algorithm_type}/live")
+async def open_live_trace(problem: str, body: Dict[str, Any] = Body(...), algorithm_type: Optional[str] = None, window: int = DEFAULT_LIVE_WINDOW, detail: TraceDetail = TraceDetail.FULL,
+                          snapshots: SnapshotMode = SnapshotMode.FULL, keyframe_every: int = DEFAULT_KEYFRAME_INTERVAL):
+    try:
+        input_model, make_trace = get_solver(problem, algorithm_type)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown problem: {problem}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        data = input_model.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    trace = make_trace(data, detail)
+    if snapshots == SnapshotMode.DELTA:
+        trace = delta_trace(trace, keyframe_every)
+    live = open_session(trace, window)
+    return {"live_id": live.id, "window": live.credit, "events": f"/live/{live.id}/events"}
+
+@app.get("/live/{live_id}/events")
+async def live_trace_events(live_id: str):
+    live = LIVE_SESSIONS.get(live_id)
+    if live is None or live.connected:
+        raise HTTPException(status_code=404, detail="Live trace not found")
+    return StreamingResponse(iter_sse(live), media_type="text/event-stream")
+
+@app.post("/live/{live_id}/ack")
+async def live_trace_ack(live_id: str, ack: int = Body(..., embed=True)):
+    live = LIVE_SESSIONS.get(live_id)
+    if live is None:
+        raise HTTPException(status_code=404, detail="Live trace not found")
+    live.grant(ack)
+    return {"credit": live.credit}
 
 # Vercel Serverless Handler
 handler = Mangum(app)
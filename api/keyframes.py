@@ -0,0 +1,132 @@
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic_core import from_json, to_json
+from api.models import Step, StepType
+from api.snapshots import SNAPSHOT_FIELDS, apply_delta
+
+# Keyframes let the timeline jump to step k without replaying from step 0.
+# TraceState is what the visualizer shows after a step, rebuilt the same way the
+# frontend's useAlgorithmState replays a trace: the DP table from INIT/UPDATE
+# steps, the highlighted cell, the greedy pick/reject decisions, plus the latest
+# dp_array / distances / visited / mst_edges (delta encoded steps included).
+# A keyframe is a serialized TraceState taken after a step; the seek index is
+# the sorted list of those step numbers.
+DEFAULT_KEYFRAME_STEPS = 256
+MAX_KEYFRAME_STEPS = 100_000
+# Large states (big DP tables) are snapshotted less often: at most once per
+# state size / KEYFRAME_STATE_RATIO steps, which keeps keyframes to a few bytes
+# per step while a seek still replays only a small slice of the trace.
+KEYFRAME_STATE_RATIO = 16
+
+
+class TraceState:
+    def __init__(self, snapshot: Optional[Dict[str, Any]] = None):
+        snapshot = snapshot or {}
+        self.table: Optional[List[List[Any]]] = snapshot.get("table")
+        self.highlight: Optional[Dict[str, int]] = snapshot.get("highlight")
+        self.decisions: List[Dict[str, Any]] = snapshot.get("decisions", [])
+        self.fields: Dict[str, Any] = snapshot.get("fields", {})
+
+    @property
+    def size(self) -> int:
+        # Rough number of values a snapshot holds, used to space keyframes out
+        cells = len(self.table) * len(self.table[0]) if self.table else 0
+        return cells + len(self.decisions) + sum(len(value) for value in self.fields.values() if value)
+
+    def _set_cell(self, cell: Dict[str, Any]):
+        # LCS addresses its cells as {"cell": {"r": i, "c": j}}, everything else as i/j
+        if isinstance(cell.get("cell"), dict):
+            row, col = cell["cell"].get("r"), cell["cell"].get("c")
+        else:
+            row, col = cell.get("i"), cell.get("j")
+        if "value" not in cell or not isinstance(row, int) or not isinstance(col, int):
+            return
+        if 0 <= row < len(self.table) and 0 <= col < len(self.table[row]):
+            self.table[row][col] = cell["value"]
+            self.highlight = {"row": row, "col": col}
+
+    def apply(self, step: Step):
+        data = step.data
+        if step.type == StepType.INIT:
+            if data.get("rows") and data.get("cols"):
+                self.table = [[0] * data["cols"] for _ in range(data["rows"])]
+        elif step.type == StepType.UPDATE:
+            if self.table:
+                # Row level traces send a whole row (knapsack / LCS) or a list of cells (matrix chain)
+                if "row" in data and isinstance(data.get("i"), int) and 0 <= data["i"] < len(self.table):
+                    self.table[data["i"]] = list(data["row"])
+                for cell in data.get("cells", [data]):
+                    self._set_cell(cell)
+        elif step.type == StepType.HIGHLIGHT:
+            if "i" in data and "j" in data:
+                self.highlight = {"row": data["i"], "col": data["j"]}
+            elif isinstance(data.get("active_cell"), dict):
+                self.highlight = {"row": data["active_cell"].get("r"), "col": data["active_cell"].get("c")}
+        elif step.type in (StepType.PICK, StepType.REJECT):
+            decision = {key: value for key, value in data.items() if key not in SNAPSHOT_FIELDS and key != "delta"}
+            decision["picked"] = step.type == StepType.PICK
+            self.decisions.append(decision)
+
+        for field in SNAPSHOT_FIELDS:
+            if field in data:
+                self.fields[field] = data[field]
+        for field, delta in data.get("delta", {}).items():
+            self.fields[field] = apply_delta(SNAPSHOT_FIELDS[field], self.fields.get(field, []), delta)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "table": self.table,
+            "highlight": self.highlight,
+            "decisions": self.decisions,
+            "fields": self.fields,
+        }
+
+
+class KeyframeIndex:
+    """
+    Built while a trace is recorded. A keyframe is taken once at least
+    `interval` steps have passed since the previous one (further apart for
+    large states, see KEYFRAME_STATE_RATIO). Seeking replays only the steps
+    between the nearest keyframe and the target, however long the trace is.
+    """
+    def __init__(self, interval: int = DEFAULT_KEYFRAME_STEPS):
+        self.interval = max(1, min(interval, MAX_KEYFRAME_STEPS))
+        self.steps: List[int] = []
+        self.frames: List[bytes] = []
+        self._state = TraceState()
+        self._count = 0
+        self._since = 0
+
+    @property
+    def size(self) -> int:
+        return sum(len(frame) for frame in self.frames)
+
+    def add(self, step: Step):
+        self._state.apply(step)
+        self._count += 1
+        self._since += 1
+        if self._since >= self.interval and self._since * KEYFRAME_STATE_RATIO >= self._state.size:
+            self.steps.append(self._count - 1)
+            self.frames.append(to_json(self._state.snapshot(), inf_nan_mode="null"))
+            self._since = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "steps": self.steps,
+            "states": [from_json(frame) for frame in self.frames],
+        }
+
+    def seek(self, step: int) -> Tuple[int, TraceState]:
+        """Returns the nearest keyframe at or before `step` (-1 for none) and its state."""
+        index = bisect_right(self.steps, step) - 1
+        if index < 0:
+            return -1, TraceState()
+        return self.steps[index], TraceState(from_json(self.frames[index]))
+
+
+def build_keyframes(steps: List[Step], interval: int = DEFAULT_KEYFRAME_STEPS) -> KeyframeIndex:
+    keyframes = KeyframeIndex(interval)
+    for step in steps:
+        keyframes.add(step)
+    return keyframes
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional, Union
 from enum import Enum
+from api.descriptions import render_description
 
 class AlgorithmType(str, Enum):
     GREEDY = "greedy"
@@ -19,25 +20,141 @@ class StepType(str, Enum):
     REJECT = "reject"
     SORT = "sort"
 
+class TraceDetail(str, Enum):
+    NONE = "none"   # result only, no steps recorded
+    KEY = "key"     # structural steps: INIT/SORT/PICK/REJECT/SOLUTION
+    ROW = "row"     # key steps plus one aggregated step per DP row / node expansion
+    FULL = "full"   # every cell, comparison and relaxation
+
+class SnapshotMode(str, Enum):
+    FULL = "full"     # growing state (dp arrays, distances, MST edges...) copied into every step
+    DELTA = "delta"   # only the changes, with a full copy every keyframe interval
+
 class Step(BaseModel):
     type: StepType
-    description: str
+    description: str = ""
     data: Dict[str, Any] = {}
     # Optional fields for specific animations can go into 'data'
     # e.g., for DP: i, j, value, dependencies
     # e.g., for Greedy: item_index, current_capacity
+    # Deferred description: a template id from api.descriptions and its
+    # positional args. Not serialized; render() formats them into `description`
+    # right before a step is sent, unless the client asked for templates.
+    template: Optional[str] = Field(default=None, exclude=True)
+    args: Optional[List[Any]] = Field(default=None, exclude=True)
+    # Set by solvers on steps that change the answer (a better DP value, a
+    # relaxed edge, a merge...). Not serialized; a step budget never drops them.
+    decisive: bool = Field(default=False, exclude=True)
+    # Large objects the step's data refers to by {"$ref": key}; collected into
+    # the response's shared context section (see api/context.py). Not serialized.
+    context: Optional[Dict[str, Any]] = Field(default=None, exclude=True)
+
+    def describe(self) -> str:
+        if self.template is None:
+            return self.description
+        return render_description(self.template, self.args)
+
+    def render(self) -> "Step":
+        if self.template is not None and not self.description:
+            self.description = render_description(self.template, self.args)
+        return self
+
+class TraceRecorder:
+    """
+    What solvers emit their steps through. The key/rows/cells switches say which
+    levels of TraceDetail are recorded; nothing is built for a level that is
+    off, so TraceDetail.NONE costs a flag check per event. step() builds a Step
+    straight from trusted solver values, skipping pydantic validation (and the
+    copy of `data` it makes), which used to dominate the solvers' hot loops.
+    Steps are validated as usual wherever they come from outside.
+    """
+    __slots__ = ("key", "rows", "cells")
+
+    def __init__(self, detail: TraceDetail = TraceDetail.FULL):
+        detail = TraceDetail(detail)
+        self.key = detail != TraceDetail.NONE
+        self.rows = detail == TraceDetail.ROW
+        self.cells = detail == TraceDetail.FULL
+
+    @staticmethod
+    def step(type: StepType, description: str = "", data: Optional[Dict[str, Any]] = None,
+             template: Optional[str] = None, args: Optional[List[Any]] = None,
+             decisive: bool = False, context: Optional[Dict[str, Any]] = None) -> Step:
+        step = _new_object(Step)
+        _set_attribute(step, "__dict__", {
+            "type": type, "description": description, "data": {} if data is None else data,
+            "template": template, "args": args, "decisive": decisive, "context": context,
+        })
+        _set_attribute(step, "__pydantic_fields_set__", set())
+        _set_attribute(step, "__pydantic_extra__", None)
+        _set_attribute(step, "__pydantic_private__", None)
+        return step
+
+_new_object = object.__new__
+_set_attribute = object.__setattr__
 
 class Metrics(BaseModel):
     time_taken: float  # in seconds
     space_complexity: str # e.g. "O(N*W)"
     time_complexity: str # e.g. "O(N*W)"
     step_count: int
+    # Steps left out to fit ?max_steps (see api/sampling.py)
+    dropped_steps: int = 0
 
 class AlgorithmResult(BaseModel):
     steps: List[Step]
     result_value: float
     selected_items: List[int] # Indices of selected items
     metrics: Metrics
+    # Objects referenced from step data as {"$ref": key} (see api/context.py)
+    context: Dict[str, Any] = {}
+
+class TraceSummary(BaseModel):
+    # Returned instead of the full result when the trace is kept server side;
+    # steps are paged through GET /traces/{trace_id}/steps
+    trace_id: str
+    result_value: float
+    selected_items: List[int]
+    metrics: Metrics
+    # Seek index: steps after which a keyframe was taken (GET /traces/{trace_id}/state)
+    keyframes: List[int] = []
+    context: Dict[str, Any] = {}
+
+class RunSummary(BaseModel):
+    # One side of a TraceDiff: the outcome of a run without its steps
+    algorithm: AlgorithmType
+    result_value: float
+    selected_items: List[int]
+    step_count: int
+    time_taken: float
+
+class SelectionDivergence(BaseModel):
+    # An item (or coin value) the two runs selected a different number of times,
+    # with the step at which each run decided on it, if it did so in a step
+    item: int
+    left_count: int
+    right_count: int
+    left_step: Optional[int] = None
+    right_step: Optional[int] = None
+
+class TraceDiff(BaseModel):
+    problem: str
+    left: RunSummary
+    right: RunSummary
+    result_gap: float                 # right.result_value - left.result_value
+    step_ratio: Optional[float]       # right.step_count / left.step_count
+    time_ratio: Optional[float]       # right.time_taken / left.time_taken
+    common_items: List[int]
+    divergences: List[SelectionDivergence]
+
+class ResultSummary(BaseModel):
+    # Returned by a solver's step generator once the trace is exhausted;
+    # time_taken and step_count are filled in by whoever consumed the steps.
+    result_value: float
+    selected_items: List[int]
+    space_complexity: str
+    time_complexity: str
+    dropped_steps: int = 0
 
 class KnapsackItem(BaseModel):
     id: int
@@ -48,6 +165,43 @@ class KnapsackInput(BaseModel):
     capacity: int
     items: List[KnapsackItem]
 
+class KnapsackEditOp(str, Enum):
+    APPEND = "append"      # add `item` at the end
+    INSERT = "insert"      # add `item` before position `index`
+    REPLACE = "replace"    # swap the item at `index` for `item`
+    REMOVE = "remove"      # drop the item at `index`
+    MOVE = "move"          # move the item at `index` to position `to`
+    CAPACITY = "capacity"  # change the capacity to `capacity`
+
+class KnapsackEdit(BaseModel):
+    op: KnapsackEditOp
+    index: Optional[int] = None
+    to: Optional[int] = None
+    item: Optional[KnapsackItem] = None
+    capacity: Optional[int] = None
+
+class TextEdit(BaseModel):
+    # New value of either text of an LCS / edit distance session; a text
+    # that is left out stays as it is
+    text1: Optional[str] = None
+    text2: Optional[str] = None
+
+class SessionState(BaseModel):
+    # Returned by the /sessions routes (see api/sessions.py). Only what changed
+    # in the DP table since the previous response is sent: row changed_from + k
+    # becomes its first columns_from cells followed by rows[k], rows before
+    # changed_from are unchanged and the table now ends after the last row sent.
+    session_id: str
+    problem: str
+    result_value: float
+    selected_items: List[int]
+    result_text: Optional[str] = None  # the LCS itself, for LCS sessions
+    cells_computed: int   # DP cells this request had to (re)compute
+    time_taken: float     # in seconds
+    changed_from: int
+    columns_from: int = 0
+    rows: List[List[int]] = []
+
 class CoinChangeInput(BaseModel):
     amount: int
     coins: List[int]
@@ -70,6 +224,11 @@ class LCSInput(BaseModel):
     text1: str
     text2: str
 
+class LCSMethod(str, Enum):
+    TABLE = "table"            # the whole (n+1) x (m+1) table, traced cell by cell
+    HIRSCHBERG = "hirschberg"  # divide and conquer in O(n + m) memory, for long texts
+    BIT_PARALLEL = "bit-parallel"  # the length only, a whole row per big-int operation
+
 class DijkstraInput(BaseModel):
     graph: dict # Simplified, might need more structure
     start_node: str
@@ -81,6 +240,10 @@ class EditDistanceInput(BaseModel):
 class LISInput(BaseModel):
     sequence: List[int]
 
+class LISMethod(str, Enum):
+    DP = "dp"              # compares every pair, O(n²)
+    PATIENCE = "patience"  # patience sorting, O(n log n), for long sequences
+
 class RodCuttingInput(BaseModel):
     length: int
     prices: List[int]
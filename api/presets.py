@@ -0,0 +1,173 @@
+import os
+import time
+from typing import Any, Dict, List, Tuple
+from pydantic_core import to_json
+from api.algorithms import SOLVERS
+from api.models import LCSMethod, LISMethod
+
+# Startup warm-up of the result cache (see api/result_cache.py).
+# Most traffic is the frontend's canned inputs: the visualizer's default input
+# and presets per problem (pages/Visualizer.tsx, components/VisualizerInputPresets.tsx),
+# the playground presets (components/InputPresets.tsx) and the challenge test
+# cases (data/ChallengeData.ts). PRESET_INPUTS declares them; at startup each
+# one is sent through the app for every algorithm type its problem supports,
+# exactly as the frontend would send it, so the first real request for a
+# preset is a cache hit. Keep this manifest in step with those files.
+PRECOMPUTE_PRESETS = os.environ.get("PRECOMPUTE_PRESETS", "1") != "0"
+
+# Problems whose /solve path names the algorithm type
+TYPED_PATHS = frozenset(["knapsack", "coin-change", "interval-scheduling", "matrix-chain"])
+# Problems whose /solve path takes ?method=; the first method is the default,
+# which the frontend selects by leaving the parameter out
+METHODS = {"lis": LISMethod, "lcs": LCSMethod}
+
+_TEXTBOOK_KNAPSACK = {"capacity": 50, "items": [
+    {"id": 1, "weight": 10, "value": 60}, {"id": 2, "weight": 20, "value": 100}, {"id": 3, "weight": 30, "value": 120},
+]}
+_MST_GRAPH = {"start_node": "A", "graph": {
+    "A": {"B": 2, "C": 3}, "B": {"A": 2, "C": 1, "D": 1, "E": 4}, "C": {"A": 3, "B": 1, "F": 5},
+    "D": {"B": 1, "E": 1}, "E": {"B": 4, "D": 1, "F": 1}, "F": {"C": 5, "E": 1},
+}}
+_GRID_GRAPH = {"start_node": "A", "graph": {
+    "A": {"B": 2, "C": 4}, "B": {"A": 2, "C": 1, "D": 7}, "C": {"A": 4, "B": 1, "D": 3}, "D": {"B": 7, "C": 3},
+}}
+_NETWORK_GRAPH = {"start_node": "S", "graph": {
+    "S": {"A": 4, "B": 2}, "A": {"S": 4, "B": 5, "C": 10}, "B": {"S": 2, "A": 5, "C": 3},
+    "C": {"A": 10, "B": 3, "D": 4}, "D": {"C": 4, "E": 11}, "E": {"D": 11},
+}}
+
+
+def _knapsack(capacity: int, items: List[Tuple[int, int]]) -> Dict[str, Any]:
+    return {"capacity": capacity, "items": [
+        {"id": number, "weight": weight, "value": value} for number, (weight, value) in enumerate(items, 1)
+    ]}
+
+
+def _intervals(spans: List[Tuple[int, int]]) -> Dict[str, Any]:
+    return {"intervals": [{"id": number, "start": start, "end": end} for number, (start, end) in enumerate(spans, 1)]}
+
+
+PRESET_INPUTS: Dict[str, List[Dict[str, Any]]] = {
+    "knapsack": [
+        _TEXTBOOK_KNAPSACK,
+        _knapsack(7, [(1, 1), (3, 4), (4, 5), (5, 7)]),
+        _knapsack(10, [(5, 10), (4, 40), (6, 30), (3, 50)]),
+        _knapsack(100, [(10, 60), (20, 100), (30, 120), (15, 80), (25, 95), (35, 140), (5, 25), (40, 165)]),
+        _knapsack(10, [(3, 4), (4, 5), (5, 6)]),
+        _knapsack(50, [(5, 10), (4, 40), (6, 30), (3, 50), (10, 35), (9, 45), (12, 60), (7, 25), (8, 38),
+                       (4, 22), (6, 28), (5, 24)]),
+        _knapsack(100, [(12, 24), (7, 13), (11, 23), (8, 15), (9, 16), (13, 28), (6, 11), (14, 30), (10, 20),
+                        (5, 8), (15, 32), (4, 7), (16, 35), (11, 24), (9, 18)]),
+    ],
+    "coin-change": [
+        {"amount": 11, "coins": [1, 2, 5]},
+        {"amount": 6, "coins": [1, 3, 4]},
+        {"amount": 63, "coins": [1, 5, 10, 25]},
+        {"amount": 14, "coins": [1, 3, 7, 10]},
+        {"amount": 99, "coins": [1, 5, 10, 20, 50]},
+        {"amount": 11, "coins": [1, 3, 4]},
+        {"amount": 30, "coins": [1, 6, 7, 10]},
+        {"amount": 99, "coins": [1, 5, 10, 21, 25]},
+        {"amount": 127, "coins": [1, 3, 7, 13, 19]},
+    ],
+    "interval-scheduling": [
+        _intervals([(1, 3), (2, 5), (4, 6), (6, 8), (5, 7)]),
+        _intervals([(0, 3), (2, 5), (4, 7), (6, 9)]),
+        _intervals([(0, 6), (1, 4), (3, 5), (3, 8), (4, 7), (5, 9), (6, 10), (8, 11), (8, 12), (11, 14)]),
+        _intervals([(0, 2), (1, 3), (2, 4), (3, 5), (4, 6), (5, 7), (6, 8), (7, 9), (8, 10), (9, 11),
+                    (0, 11), (2, 9), (3, 7), (5, 10), (1, 8), (4, 9), (6, 11), (0, 5), (3, 10), (7, 11)]),
+        _intervals([(i // 3 * 2, i // 3 * 2 + i % 3 + 2) for i in range(30)]),
+    ],
+    "matrix-chain": [
+        {"dimensions": [40, 20, 30, 10, 30]},
+        {"dimensions": [10, 20, 30, 40, 30]},
+    ],
+    "huffman": [
+        {"text": "abracadabra"},
+        {"text": "this is an example for huffman encoding"},
+        {"text": "aaaaabbbbcccdde"},
+    ],
+    "lcs": [
+        {"text1": "STONE", "text2": "LONGEST"},
+        {"text1": "AGGTAB", "text2": "GXTXAYB"},
+        {"text1": "intention", "text2": "execution"},
+    ],
+    "dijkstra": [
+        {"start_node": "A", "graph": {
+            "A": {"B": 4, "C": 2}, "B": {"C": 5, "D": 10}, "C": {"E": 3}, "D": {"F": 11}, "E": {"D": 4}, "F": {},
+        }},
+        _GRID_GRAPH,
+        _NETWORK_GRAPH,
+    ],
+    "prims": [_MST_GRAPH, _GRID_GRAPH, _NETWORK_GRAPH],
+    "kruskals": [_MST_GRAPH, _GRID_GRAPH, _NETWORK_GRAPH],
+    "edit-distance": [
+        {"text1": "sunday", "text2": "saturday"},
+        {"text1": "horse", "text2": "ros"},
+        {"text1": "algorithm", "text2": "altruistic"},
+    ],
+    "lis": [
+        {"sequence": [10, 22, 9, 33, 21, 50, 41, 60, 80]},
+        {"sequence": [1, 10, 2, 9, 3, 8, 4, 7]},
+    ],
+    "rod-cutting": [
+        {"length": 8, "prices": [1, 5, 8, 9, 10, 17, 17, 20]},
+    ],
+}
+
+
+def preset_requests() -> List[Tuple[str, Dict[str, Any]]]:
+    """(path, body) of every preset request, one per algorithm type or method of its problem."""
+    requests = []
+    for problem, inputs in PRESET_INPUTS.items():
+        _, solvers = SOLVERS[problem]
+        if problem in TYPED_PATHS:
+            paths = [f"/solve/{problem}/{algorithm_type.value}" for algorithm_type in solvers]
+        elif problem in METHODS:
+            _, *others = METHODS[problem]
+            paths = [f"/solve/{problem}"] + [f"/solve/{problem}?method={method.value}" for method in others]
+        else:
+            paths = [f"/solve/{problem}"]
+        requests.extend((path, body) for path in paths for body in inputs)
+    return requests
+
+
+async def _call(app, path: str, body: bytes) -> int:
+    # One in-process request through the whole middleware stack, so the cache
+    # key is the one a real request computes
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": None, "server": None,
+    }
+    status = 0
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def precompute_presets(app) -> Dict[str, Any]:
+    """Runs every preset request once so its result is cached; returns a report."""
+    started = time.perf_counter()
+    failed = []
+    requests = preset_requests()
+    for path, body in requests:
+        status = await _call(app, path, to_json(body))
+        if status != 200:
+            failed.append({"path": path, "status": status})
+    return {"requests": len(requests), "failed": failed, "seconds": time.perf_counter() - started}
@@ -0,0 +1,191 @@
+from typing import Optional
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from api.algorithms import ENGINE_VERSION
+from api.descriptions import template_table
+from api.encoding import (
+    BINARY_CODECS, BINARY_MEDIA_ALIASES, COLUMNAR_MEDIA_TYPE, NDJSON_MEDIA_TYPE,
+    dump_steps, iter_ndjson, pack, to_columnar, to_compact
+)
+from api.etags import etag_matches, make_etag
+from api.keyframes import DEFAULT_KEYFRAME_STEPS, build_keyframes
+from api.models import SnapshotMode, TraceDetail, TraceSummary
+from api.result_cache import CachedResponse, cache_key, result_cache
+from api.sampling import budget_trace
+from api.snapshots import DEFAULT_KEYFRAME_INTERVAL, delta_trace
+from api.trace_store import TraceTooLarge, store_flag, store_trace
+from api.tracing import StepTrace, run_trace
+
+
+def wants_columnar(request: Request) -> bool:
+    if request.query_params.get("format") == "columnar":
+        return True
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def binary_media_type(request: Request) -> Optional[str]:
+    """The first installed binary format named in the Accept header, if any."""
+    accept = request.headers.get("accept", "")
+    offered = []
+    for media_type in list(BINARY_CODECS) + list(BINARY_MEDIA_ALIASES):
+        position = accept.find(media_type)
+        canonical = BINARY_MEDIA_ALIASES.get(media_type, media_type)
+        if position >= 0 and canonical in BINARY_CODECS:
+            offered.append((position, canonical))
+    return min(offered)[1] if offered else None
+
+
+def wants_templates(request: Request) -> bool:
+    return request.query_params.get("descriptions") == "template"
+
+
+def wants_stored(request: Request) -> bool:
+    return store_flag(request.query_params.get("store"))
+
+
+def snapshot_interval(request: Request) -> Optional[int]:
+    """
+    ?snapshots=delta (and optionally &keyframe_every=N) asks for delta encoded
+    state fields; returns the keyframe interval, or None for full snapshots.
+    """
+    try:
+        mode = SnapshotMode(request.query_params.get("snapshots", SnapshotMode.FULL))
+        interval = int(request.query_params.get("keyframe_every", DEFAULT_KEYFRAME_INTERVAL))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return interval if mode == SnapshotMode.DELTA else None
+
+
+def keyframe_steps(request: Request) -> Optional[int]:
+    """?keyframes=N asks for a keyframe roughly every N steps; None when not requested."""
+    value = request.query_params.get("keyframes")
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def step_budget(request: Request) -> Optional[int]:
+    """?max_steps=N caps the number of steps sent (see api/sampling.py); None when not requested."""
+    value = request.query_params.get("max_steps")
+    if value is None:
+        return None
+    try:
+        max_steps = int(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if max_steps < 1:
+        raise HTTPException(status_code=400, detail="max_steps must be at least 1")
+    return max_steps
+
+
+def prepare_trace(trace: StepTrace, request: Request) -> StepTrace:
+    # Sample first: deltas must be taken between the steps that are actually sent
+    max_steps = step_budget(request)
+    if max_steps is not None:
+        trace = budget_trace(trace, max_steps)
+    interval = snapshot_interval(request)
+    return trace if interval is None else delta_trace(trace, interval)
+
+
+def result_key(request: Request, data: BaseModel) -> str:
+    """Cache key of a /solve response (see api/result_cache.py)."""
+    params = request.query_params
+    options = sorted((name, value) for name, value in params.multi_items() if name != "detail")
+    return cache_key([
+        ENGINE_VERSION.encode(),
+        request.url.path.encode(),
+        TraceDetail(params.get("detail", TraceDetail.FULL)).value.encode(),
+        to_json(options),
+        b"columnar" if wants_columnar(request) else b"",
+        (binary_media_type(request) or "").encode(),
+        data.model_dump_json().encode(),
+    ])
+
+
+def render_result(trace: StepTrace, request: Request, data: Optional[BaseModel] = None) -> Response:
+    """
+    Runs a solver and negotiates the result shape for a /solve route (see
+    build_response). Given the route's validated input, identical requests are
+    answered from the result cache without running the solver, and carry an
+    ETag derived from the same key (see api/etags.py); a matching If-None-Match
+    gets a 304 with no body at all. ?store=true requests always run, since each
+    one creates a new trace.
+    """
+    if data is None or wants_stored(request):
+        return build_response(trace, request)
+    key = result_key(request, data)
+    headers = {"ETag": make_etag(key)}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return Response(cached.body, media_type=cached.media_type, headers=headers)
+    response = build_response(trace, request)
+    result_cache.put(key, CachedResponse(response.body, response.media_type))
+    response.headers.update(headers)
+    return response
+
+
+def build_response(trace: StepTrace, request: Request) -> Response:
+    """
+    Runs a solver and negotiates the result shape for a /solve route.
+    The default AlgorithmResult JSON is encoded here, like every other shape,
+    so the body can go into the result cache as is.
+    ?store=true keeps the steps server side and only returns a TraceSummary.
+    ?format=columnar or an Accept header of COLUMNAR_MEDIA_TYPE selects the
+    struct-of-arrays trace; everything else gets the default AlgorithmResult JSON.
+    ?max_steps=N and ?snapshots=delta apply to all of them (see api/sampling.py
+    and api/snapshots.py), and ?keyframes=N adds a keyframe section (see
+    api/keyframes.py).
+    ?descriptions=template leaves step descriptions unformatted and sends the
+    template table once instead (see api/descriptions.py).
+    An Accept header naming MessagePack or CBOR gets the same payload in that
+    format, with the default trace in the compact layout (see encoding.to_compact).
+    """
+    trace = prepare_trace(trace, request)
+    keyframes = keyframe_steps(request)
+    binary = binary_media_type(request)
+    if wants_stored(request):
+        try:
+            stored = store_trace(trace, keyframe_steps=keyframes or DEFAULT_KEYFRAME_STEPS)
+        except TraceTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        summary = TraceSummary(trace_id=stored.id, **stored.summary)
+        if binary is not None:
+            return Response(pack(summary.model_dump(), binary), media_type=binary)
+        return Response(summary.model_dump_json(), media_type="application/json")
+    templates = wants_templates(request)
+    result = run_trace(trace, render=not templates)
+    if wants_columnar(request):
+        payload = to_columnar(result, templates)
+        media_type = COLUMNAR_MEDIA_TYPE
+    elif binary is not None:
+        payload = to_compact(result, templates)
+        media_type = binary
+    elif keyframes is not None or templates:
+        payload = result.model_dump(exclude={"steps"})
+        payload["steps"] = dump_steps(result.steps, templates)
+        media_type = "application/json"
+    else:
+        return Response(result.model_dump_json(), media_type="application/json")
+    if templates:
+        payload["templates"] = template_table(step.template for step in result.steps)
+    if keyframes is not None:
+        payload["keyframes"] = build_keyframes(result.steps, keyframes).to_dict()
+    if binary is not None:
+        return Response(pack(payload, binary), media_type=binary)
+    # Same float handling as the default encoder: inf/nan become null
+    return Response(to_json(payload, inf_nan_mode="null"), media_type=media_type)
+
+
+def stream_result(trace: StepTrace, request: Request) -> StreamingResponse:
+    """
+    Streams a solver's steps as NDJSON while it runs (see encoding.iter_ndjson).
+    With ?max_steps the sampled steps only start once the solver has finished.
+    """
+    return StreamingResponse(iter_ndjson(prepare_trace(trace, request)), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,104 @@
+from typing import Dict, List, Optional, Tuple
+from api.models import Step, StepType
+from api.tracing import StepTrace
+
+# Step budget (?max_steps=N).
+# A trace that would go over the budget is thinned out instead of cut off.
+# Steps fall into three tiers:
+#   0  INIT, SORT, SOLUTION and every PICK/REJECT: always kept
+#   1  steps a solver flagged as decisive (a DP update that improved the best
+#      value, a relaxed edge, a merge...): kept unless they alone overflow
+#   2  the remaining HIGHLIGHT/UPDATE/INFO steps
+# Once the whole trace is in, the budget is filled exactly: all of tier 0, then
+# evenly spaced tier 1 steps up to what is left of the budget, then evenly
+# spaced tier 2 steps for the rest, so tier 2 empties out before any decisive
+# step goes. To bound memory while the trace comes in, each of tiers 1 and 2
+# keeps only every `stride`-th of its steps, doubling the stride whenever more
+# than twice the budget pile up; that leaves at least a budget's worth of
+# evenly spread candidates per tier, enough for any selection. Dropped steps
+# are never rendered.
+MAX_STEP_BUDGET = 1_000_000
+STRUCTURAL_STEPS = {StepType.INIT, StepType.SORT, StepType.SOLUTION, StepType.PICK, StepType.REJECT}
+
+
+def step_tier(step: Step) -> int:
+    if step.type in STRUCTURAL_STEPS:
+        return 0
+    return 1 if step.decisive else 2
+
+
+class StepSampler:
+    def __init__(self, max_steps: int):
+        self.max_steps = max(1, min(max_steps, MAX_STEP_BUDGET))
+        self.total = 0
+        # Per sampled tier: keep every stride-th step, steps seen so far
+        self.strides = {1: 1, 2: 1}
+        self.seen = {1: 0, 2: 0}
+        # Per tier: (position in the trace, number within the tier, step)
+        self._kept: Dict[int, List[Tuple[int, int, Step]]] = {0: [], 1: [], 2: []}
+        self._selected: Optional[List[Step]] = None
+
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.steps)
+
+    def add(self, step: Step):
+        position = self.total
+        self.total += 1
+        tier = step_tier(step)
+        if tier == 0:
+            self._kept[0].append((position, 0, step))
+            return
+        number = self.seen[tier]
+        self.seen[tier] += 1
+        stride = self.strides[tier]
+        if number % stride:
+            return
+        kept = self._kept[tier]
+        kept.append((position, number, step))
+        if len(kept) > 2 * self.max_steps:
+            stride *= 2
+            self.strides[tier] = stride
+            self._kept[tier] = [entry for entry in kept if entry[1] % stride == 0]
+
+    @staticmethod
+    def _spread(entries: List[Tuple[int, int, Step]], count: int) -> List[Tuple[int, int, Step]]:
+        """`count` of the entries, evenly spaced."""
+        if count >= len(entries):
+            return entries
+        return [entries[k * len(entries) // count] for k in range(count)]
+
+    @property
+    def steps(self) -> List[Step]:
+        if self._selected is None:
+            structural = self._kept[0]
+            left = max(0, self.max_steps - len(structural))
+            decisive = self._spread(self._kept[1], left)
+            left -= len(decisive)
+            rest = self._spread(self._kept[2], left)
+            selected = sorted(structural + decisive + rest, key=lambda entry: entry[0])
+            # A trace over the budget fills it exactly, unless tier 0 alone is over
+            assert self.total <= self.max_steps or len(selected) == max(self.max_steps, len(structural))
+            self._selected = [step for _, _, step in selected]
+        return self._selected
+
+
+def budget_trace(trace: StepTrace, max_steps: int) -> StepTrace:
+    """
+    Wraps a solver so at most `max_steps` steps come out (more only when tier 0
+    steps alone go over). The whole trace is consumed before the first step is
+    yielded, since which steps survive depends on how long it turns out to be.
+    The returned summary counts the dropped steps.
+    """
+    sampler = StepSampler(max_steps)
+    try:
+        while True:
+            try:
+                sampler.add(next(trace))
+            except StopIteration as stop:
+                summary = stop.value
+                break
+    finally:
+        trace.close()
+    yield from sampler.steps
+    return summary.model_copy(update={"dropped_steps": sampler.dropped})
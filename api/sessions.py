@@ -0,0 +1,479 @@
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from api.models import (
+    EditDistanceInput, KnapsackEdit, KnapsackEditOp, KnapsackInput, KnapsackItem, LCSInput, SessionState, TextEdit
+)
+
+# Incremental DP sessions, for inputs that are edited one change at a time.
+# A session keeps the DP table of its current input. An edit only marks the
+# rows that depend on what changed as stale; the next refresh recomputes those
+# and nothing else, so appending a knapsack item costs one new row and editing
+# item k costs rows k..n instead of the whole table; for LCS / edit distance,
+# typing at the end of text1 costs one row and typing at the end of text2 one
+# column, however long the texts already are. Sessions live in a bounded
+# in-memory store like the trace store: least recently used ones are dropped
+# once the tables go over SESSION_STORE_MAX_BYTES, idle ones after SESSION_TTL.
+SESSION_STORE_MAX_BYTES = int(os.environ.get("SESSION_STORE_MAX_BYTES", 256 * 1024 * 1024))
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 30 * 60))
+
+# Rough cost of a table cell (list slot) and of a row (list object)
+CELL_BYTES = 8
+ROW_OVERHEAD_BYTES = 56
+
+
+class SessionTooLarge(Exception):
+    pass
+
+
+def knapsack_row(previous: List[int], weight: int, value: int) -> List[int]:
+    """dp[i] from dp[i-1] for an item: the same recurrence as iter_knapsack_dp, a row at a time."""
+    return previous[:weight] + [
+        keep if keep >= take + value else take + value for keep, take in zip(previous[weight:], previous)
+    ]
+
+
+class DPSession(ABC):
+    """
+    Base of the incremental sessions. Subclasses keep `rows` (the DP table,
+    row 0 included) and `valid`, the number of leading rows that are still
+    current; apply() edits the input and lowers `valid` as needed, refresh()
+    recomputes the rest.
+    """
+    problem = ""
+    input_model: Type[BaseModel] = BaseModel
+    edit_model: Type[BaseModel] = BaseModel
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.last_access = time.time()
+        self.rows: List[List[Any]] = []
+        self.valid = 0
+        # Lowest row that changed since the last response, and the lowest
+        # column from which every row changed (None when no column did)
+        self.changed_from = 0
+        self.columns_from: Optional[int] = None
+        self.lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return sum(CELL_BYTES * len(row) + ROW_OVERHEAD_BYTES for row in self.rows)
+
+    def invalidate(self, row: int):
+        self.valid = min(self.valid, row)
+        self.changed_from = min(self.changed_from, row)
+
+    def invalidate_columns(self, column: int):
+        self.columns_from = column if self.columns_from is None else min(self.columns_from, column)
+
+    @abstractmethod
+    def apply(self, edit: BaseModel):
+        """Changes the input by `edit` and marks the rows and columns it makes stale."""
+
+    @abstractmethod
+    def refresh(self) -> int:
+        """Recomputes the stale rows; returns the number of cells computed."""
+
+    @classmethod
+    @abstractmethod
+    def estimate_size(cls, data: BaseModel) -> int:
+        """Size of the table for `data`, checked before building it."""
+
+    @abstractmethod
+    def input(self) -> BaseModel:
+        """The session's current input."""
+
+    @abstractmethod
+    def result(self) -> Tuple[float, List[int]]:
+        """Result value and selected items of the current table."""
+
+    def result_text(self) -> Optional[str]:
+        return None
+
+    def state(self, cells_computed: int, time_taken: float, rows: bool = True, full: bool = False) -> SessionState:
+        """
+        The result and what changed in the table since the last state: whole
+        rows from changed_from on, or when only columns changed, every row
+        from columns_from on. When both did (or `full`), the whole table.
+        """
+        result_value, selected_items = self.result()
+        changed_from = min(self.changed_from, len(self.rows))
+        columns_from = 0
+        if full or (self.columns_from is not None and changed_from < len(self.rows)):
+            changed_from = 0
+        elif self.columns_from is not None:
+            changed_from, columns_from = 0, self.columns_from
+        sent = self.rows[changed_from:]
+        if columns_from:
+            sent = [row[columns_from:] for row in sent]
+        state = SessionState(
+            session_id=self.id,
+            problem=self.problem,
+            result_value=result_value,
+            selected_items=selected_items,
+            result_text=self.result_text(),
+            cells_computed=cells_computed,
+            time_taken=time_taken,
+            changed_from=changed_from,
+            columns_from=columns_from,
+            rows=sent if rows else [],
+        )
+        self.changed_from = len(self.rows)
+        self.columns_from = None
+        return state
+
+
+class KnapsackSession(DPSession):
+    """0/1 knapsack: row i of the table depends on item i and row i-1 only."""
+    problem = "knapsack"
+    input_model = KnapsackInput
+    edit_model = KnapsackEdit
+
+    def __init__(self, data: KnapsackInput):
+        super().__init__()
+        if data.capacity < 0:
+            raise ValueError("Capacity must be at least 0")
+        for item in data.items:
+            self._check(item)
+        self.capacity = data.capacity
+        self.items: List[KnapsackItem] = list(data.items)
+        self.rows = [[0] * (self.capacity + 1)]
+        self.valid = 1
+
+    @classmethod
+    def estimate_size(cls, data: KnapsackInput) -> int:
+        return (len(data.items) + 1) * (CELL_BYTES * (data.capacity + 1) + ROW_OVERHEAD_BYTES)
+
+    def input(self) -> KnapsackInput:
+        return KnapsackInput.model_construct(capacity=self.capacity, items=list(self.items))
+
+    @staticmethod
+    def _check(item: Optional[KnapsackItem]) -> KnapsackItem:
+        if item is None:
+            raise ValueError("The edit needs an item")
+        if item.weight < 0:
+            raise ValueError(f"Item {item.id} has a negative weight")
+        return item
+
+    def _position(self, index: Optional[int], end: int) -> int:
+        if index is None or not 0 <= index < end:
+            raise ValueError(f"Item position must be between 0 and {end - 1}, got {index}")
+        return index
+
+    def apply(self, edit: KnapsackEdit):
+        # Everything is checked before anything changes: a bad edit leaves the session as it was
+        op = edit.op
+        if op == KnapsackEditOp.APPEND:
+            self.items.append(self._check(edit.item))
+            self.invalidate(len(self.items))
+        elif op == KnapsackEditOp.INSERT:
+            index = self._position(edit.index, len(self.items) + 1)
+            self.items.insert(index, self._check(edit.item))
+            self.invalidate(index + 1)
+        elif op == KnapsackEditOp.REPLACE:
+            index = self._position(edit.index, len(self.items))
+            self.items[index] = self._check(edit.item)
+            self.invalidate(index + 1)
+        elif op == KnapsackEditOp.REMOVE:
+            index = self._position(edit.index, len(self.items))
+            del self.items[index]
+            self.invalidate(index + 1)
+        elif op == KnapsackEditOp.MOVE:
+            index = self._position(edit.index, len(self.items))
+            to = self._position(edit.to, len(self.items))
+            self.items.insert(to, self.items.pop(index))
+            self.invalidate(min(index, to) + 1)
+        elif op == KnapsackEditOp.CAPACITY:
+            if edit.capacity is None or edit.capacity < 0:
+                raise ValueError("The edit needs a capacity of at least 0")
+            # Cell (i, w) only depends on row i-1 at capacities <= w: a smaller
+            # capacity keeps a prefix of every row, a larger one only needs
+            # the new columns (filled in by refresh)
+            for row in self.rows:
+                del row[edit.capacity + 1:]
+            self.invalidate_columns(min(self.capacity, edit.capacity) + 1)
+            self.capacity = edit.capacity
+        del self.rows[self.valid:]
+
+    def refresh(self) -> int:
+        cells = 0
+        width = self.capacity + 1
+        self.rows[0].extend([0] * (width - len(self.rows[0])))
+        for i in range(1, len(self.rows)):
+            row = self.rows[i]
+            if len(row) < width:
+                previous = self.rows[i - 1]
+                weight, value = self.items[i - 1].weight, self.items[i - 1].value
+                cells += width - len(row)
+                row.extend(
+                    max(previous[w], previous[w - weight] + value) if weight <= w else previous[w]
+                    for w in range(len(row), width)
+                )
+        for i in range(len(self.rows), len(self.items) + 1):
+            item = self.items[i - 1]
+            self.rows.append(knapsack_row(self.rows[i - 1], item.weight, item.value))
+            cells += width
+        self.valid = len(self.rows)
+        return cells
+
+    def result(self) -> Tuple[float, List[int]]:
+        # Same backtracking as iter_knapsack_dp
+        selected = []
+        w = self.capacity
+        for i in range(len(self.items), 0, -1):
+            if self.rows[i][w] != self.rows[i - 1][w]:
+                selected.append(self.items[i - 1].id)
+                w -= self.items[i - 1].weight
+        return self.rows[-1][self.capacity], selected
+
+
+def common_prefix(a: str, b: str) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+class TextSession(DPSession):
+    """
+    Two-text DP (LCS, edit distance): row i belongs to the prefix text1[:i] and
+    column j to text2[:j], and cell (i, j) depends on cells up and to the left
+    only. An edit keeps the rows of the prefix text1 shares with its old value
+    and, in those rows, the columns of the prefix text2 keeps; refresh extends
+    the kept rows to the new columns and builds the new rows.
+    """
+    edit_model = TextEdit
+
+    def __init__(self, data: BaseModel):
+        super().__init__()
+        self.text1 = data.text1
+        self.text2 = data.text2
+        self.valid = 0
+
+    @classmethod
+    def estimate_size(cls, data: BaseModel) -> int:
+        return (len(data.text1) + 1) * (CELL_BYTES * (len(data.text2) + 1) + ROW_OVERHEAD_BYTES)
+
+    def input(self) -> BaseModel:
+        return self.input_model.model_construct(text1=self.text1, text2=self.text2)
+
+    def apply(self, edit: TextEdit):
+        if edit.text1 is not None:
+            self.invalidate(common_prefix(self.text1, edit.text1) + 1)
+            self.text1 = edit.text1
+            del self.rows[self.valid:]
+        if edit.text2 is not None and edit.text2 != self.text2:
+            keep = common_prefix(self.text2, edit.text2) + 1
+            for row in self.rows:
+                del row[keep:]
+            self.text2 = edit.text2
+            self.invalidate_columns(keep)
+
+    @abstractmethod
+    def _base(self, i: int, j: int) -> int:
+        """Value of the cells in row 0 / column 0."""
+
+    @abstractmethod
+    def _extend(self, row: List[int], previous: List[int], char: str):
+        """Fills `row` (row i, after row i-1 `previous`, for char = text1[i-1]) up to len(text2)."""
+
+    def refresh(self) -> int:
+        width = len(self.text2) + 1
+        cells = 0
+        if not self.rows:
+            self.rows.append([])
+        first = self.rows[0]
+        cells += width - len(first)
+        first.extend(self._base(0, j) for j in range(len(first), width))
+        for i in range(1, len(self.text1) + 1):
+            if i == len(self.rows):
+                self.rows.append([self._base(i, 0)])
+                cells += 1
+            row = self.rows[i]
+            if len(row) < width:
+                cells += width - len(row)
+                self._extend(row, self.rows[i - 1], self.text1[i - 1])
+        self.valid = len(self.rows)
+        return cells
+
+
+class LCSSession(TextSession):
+    problem = "lcs"
+    input_model = LCSInput
+
+    def _base(self, i: int, j: int) -> int:
+        return 0
+
+    def _extend(self, row: List[int], previous: List[int], char: str):
+        # Same recurrence as iter_lcs_dp
+        text2 = self.text2
+        left = row[-1]
+        for j in range(len(row), len(text2) + 1):
+            if char == text2[j - 1]:
+                left = previous[j - 1] + 1
+            else:
+                up = previous[j]
+                left = up if up > left else left
+            row.append(left)
+
+    def result(self) -> Tuple[float, List[int]]:
+        return self.rows[-1][-1], []
+
+    def result_text(self) -> str:
+        # Same backtracking as iter_lcs_dp
+        rows, s1, s2 = self.rows, self.text1, self.text2
+        found = []
+        i, j = len(s1), len(s2)
+        while i > 0 and j > 0:
+            if s1[i - 1] == s2[j - 1]:
+                found.append(s1[i - 1])
+                i -= 1
+                j -= 1
+            elif rows[i - 1][j] > rows[i][j - 1]:
+                i -= 1
+            else:
+                j -= 1
+        return "".join(reversed(found))
+
+
+class EditDistanceSession(TextSession):
+    problem = "edit-distance"
+    input_model = EditDistanceInput
+
+    def _base(self, i: int, j: int) -> int:
+        return i + j
+
+    def _extend(self, row: List[int], previous: List[int], char: str):
+        # Same recurrence as iter_edit_distance_dp
+        text2 = self.text2
+        left = row[-1]
+        for j in range(len(row), len(text2) + 1):
+            if char == text2[j - 1]:
+                left = previous[j - 1]
+            else:
+                left = min(left, previous[j], previous[j - 1]) + 1
+            row.append(left)
+
+    def result(self) -> Tuple[float, List[int]]:
+        return self.rows[-1][-1], []
+
+
+# Problem name (as used in the /sessions/... paths) -> session class
+SESSION_TYPES: Dict[str, Type[DPSession]] = {
+    "knapsack": KnapsackSession,
+    "lcs": LCSSession,
+    "edit-distance": EditDistanceSession,
+}
+
+
+class SessionStore:
+    def __init__(self, max_bytes: int = SESSION_STORE_MAX_BYTES, ttl: float = SESSION_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._sessions: "OrderedDict[str, Tuple[DPSession, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _drop(self, session_id: str):
+        _, size = self._sessions.pop(session_id)
+        self.size -= size
+
+    def put(self, session: DPSession):
+        """Adds a session, or updates the size of one whose table changed."""
+        size = session.size
+        if size > self.max_bytes:
+            with self._lock:
+                if session.id in self._sessions:
+                    self._drop(session.id)
+            raise SessionTooLarge(f"Session needs {size} bytes, store holds at most {self.max_bytes}")
+        now = time.time()
+        with self._lock:
+            if session.id in self._sessions:
+                self._drop(session.id)
+            for session_id, (other, _) in list(self._sessions.items()):
+                if now - other.last_access > self.ttl:
+                    self._drop(session_id)
+            while self._sessions and self.size + size > self.max_bytes:
+                self._drop(next(iter(self._sessions)))
+            self._sessions[session.id] = (session, size)
+            self.size += size
+            session.last_access = now
+
+    def get(self, session_id: str) -> Optional[DPSession]:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            session = entry[0]
+            if now - session.last_access > self.ttl:
+                self._drop(session_id)
+                return None
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._drop(session_id)
+            return True
+
+
+session_store = SessionStore()
+
+
+def new_session(problem: str, body: Dict[str, Any], rows: bool = True, store: SessionStore = session_store) -> SessionState:
+    """
+    Validates `body` against the problem's input model and builds its table.
+    Raises KeyError for an unknown problem, pydantic's ValidationError for a bad
+    input, ValueError for one the session cannot take and SessionTooLarge for
+    a table the store could not hold.
+    """
+    session_type = SESSION_TYPES[problem]
+    data = session_type.input_model.model_validate(body)
+    if session_type.estimate_size(data) > store.max_bytes:
+        raise SessionTooLarge(f"Session would need more than the {store.max_bytes} bytes the store holds")
+    session = session_type(data)
+    start_time = time.time()
+    cells = session.refresh()
+    state = session.state(cells, time.time() - start_time, rows)
+    store.put(session)
+    return state
+
+
+def edit_session(session: DPSession, body: Dict[str, Any], rows: bool = True, store: SessionStore = session_store) -> SessionState:
+    """
+    Applies one edit (validated against the session's edit model) and brings
+    the table up to date. Raises ValidationError / ValueError for a bad edit,
+    which leaves the session unchanged, and SessionTooLarge (after dropping
+    the session) when the edited table would not fit the store.
+    """
+    edit = session.edit_model.model_validate(body)
+    with session.lock:
+        start_time = time.time()
+        session.apply(edit)
+        if session.estimate_size(session.input()) > store.max_bytes:
+            store.remove(session.id)
+            raise SessionTooLarge(f"Edited session would need more than the {store.max_bytes} bytes the store holds")
+        cells = session.refresh()
+        state = session.state(cells, time.time() - start_time, rows)
+    store.put(session)
+    return state
+
+
+def session_state(session: DPSession, rows: bool = True) -> SessionState:
+    """The session's result and its whole table."""
+    with session.lock:
+        return session.state(0, 0.0, rows, full=True)
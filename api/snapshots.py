@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Optional
+from api.models import Step
+from api.tracing import StepTrace
+
+# Delta-encoded state snapshots.
+# Some solvers attach a growing piece of state to their steps (LIS dp array,
+# Dijkstra distances, Prim's/Kruskal's MST edges...). Copying it into every
+# step makes the trace quadratic in size. In delta mode a field is sent in full
+# the first time it appears and then once every `interval` appearances; in
+# between, the step carries only what changed under data["delta"][field]:
+#   index  -> {"set": {"3": 2}}             list slots that changed (same length)
+#   key    -> {"set": {"B": 4}}             dict entries added or changed
+#   set    -> {"add": [...], "remove": [...]}  order is not meaningful
+#   append -> {"append": [...]}             items added at the end
+# An empty {} means the field is unchanged since the previous step that had it.
+SNAPSHOT_FIELDS = {
+    "dp_array": "index",
+    "distances": "key",
+    "visited": "set",
+    "mst_edges": "append",
+}
+
+DEFAULT_KEYFRAME_INTERVAL = 64
+MAX_KEYFRAME_INTERVAL = 100_000
+
+
+def _diff(kind: str, old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    # None means the change can't be expressed as a delta; send the field in full
+    if kind == "index":
+        if len(old) != len(new):
+            return None
+        changed = {str(i): value for i, (before, value) in enumerate(zip(old, new)) if before != value}
+        return {"set": changed} if changed else {}
+    if kind == "key":
+        if any(key not in new for key in old):
+            return None
+        changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+        return {"set": changed} if changed else {}
+    if kind == "set":
+        delta = {}
+        old_items, new_items = set(old), set(new)
+        added = [value for value in new if value not in old_items]
+        removed = [value for value in old if value not in new_items]
+        if added:
+            delta["add"] = added
+        if removed:
+            delta["remove"] = removed
+        return delta
+    if new[:len(old)] != old:
+        return None
+    return {"append": new[len(old):]} if len(new) > len(old) else {}
+
+
+def apply_delta(kind: str, value: Any, delta: Dict[str, Any]) -> Any:
+    if kind == "index":
+        value = list(value)
+        for index, item in delta.get("set", {}).items():
+            value[int(index)] = item
+        return value
+    if kind == "key":
+        return {**value, **delta.get("set", {})}
+    if kind == "set":
+        removed = set(delta.get("remove", []))
+        return [item for item in value if item not in removed] + delta.get("add", [])
+    return value + delta.get("append", [])
+
+
+class DeltaEncoder:
+    def __init__(self, interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        self.interval = max(1, min(interval, MAX_KEYFRAME_INTERVAL))
+        self._last: Dict[str, Any] = {}
+        self._since_full: Dict[str, int] = {}
+
+    def encode(self, step: Step) -> Step:
+        fields = [field for field in SNAPSHOT_FIELDS if field in step.data]
+        if not fields:
+            return step
+        data = dict(step.data)
+        deltas = {}
+        for field in fields:
+            value = data[field]
+            delta = None
+            if field in self._last and self._since_full[field] + 1 < self.interval:
+                delta = _diff(SNAPSHOT_FIELDS[field], self._last[field], value)
+            self._last[field] = value
+            if delta is None:
+                self._since_full[field] = 0
+            else:
+                self._since_full[field] += 1
+                deltas[field] = delta
+                del data[field]
+        if deltas:
+            data["delta"] = deltas
+        return step.model_copy(update={"data": data})
+
+
+class DeltaDecoder:
+    def __init__(self):
+        self._last: Dict[str, Any] = {}
+
+    def decode(self, step: Step) -> Step:
+        deltas = step.data.get("delta")
+        for field in SNAPSHOT_FIELDS:
+            if field in step.data:
+                self._last[field] = step.data[field]
+        if deltas is None:
+            return step
+        data = {key: value for key, value in step.data.items() if key != "delta"}
+        for field, delta in deltas.items():
+            self._last[field] = apply_delta(SNAPSHOT_FIELDS[field], self._last[field], delta)
+            data[field] = self._last[field]
+        return step.model_copy(update={"data": data})
+
+
+def delta_trace(trace: StepTrace, interval: int = DEFAULT_KEYFRAME_INTERVAL) -> StepTrace:
+    """Wraps a solver so its snapshot fields are delta encoded as the steps go by."""
+    encoder = DeltaEncoder(interval)
+    try:
+        while True:
+            try:
+                step = next(trace)
+            except StopIteration as stop:
+                return stop.value
+            yield encoder.encode(step)
+    finally:
+        trace.close()
+
+
+def expand_deltas(steps: List[Step]) -> List[Step]:
+    """Turns a delta encoded trace back into one with full state on every step."""
+    decoder = DeltaDecoder()
+    return [decoder.decode(step) for step in steps]
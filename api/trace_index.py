@@ -0,0 +1,118 @@
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from api.models import Step, StepType
+
+# Inverted index over a stored trace, for GET /traces/{trace_id}/query.
+# Every step number is filed under the step type, the DP cells it touches and
+# the graph nodes / edges it names. Each posting list is an ascending array of
+# step numbers, so a query only walks the lists for its own filters: filters
+# of different kinds are intersected, repeated values of one kind (two step
+# types...) are merged.
+# Cells come from i/j, LCS's {"cell": {"r", "c"}} / {"active_cell": ...} and
+# matrix chain's "cells" list; a whole-row update (i + "row") touches every
+# cell of row i. Nodes come from NODE_KEYS, edges from the EDGE_KEYS pairs and
+# are undirected.
+NODE_KEYS = ("node", "current_node", "checking_neighbor", "u", "v")
+EDGE_KEYS = (("u", "v"), ("current_node", "checking_neighbor"))
+GRAPH_KEYS = frozenset(NODE_KEYS)
+
+
+def edge_key(u: Any, v: Any) -> Tuple[str, str]:
+    return tuple(sorted((str(u), str(v))))
+
+
+def merge(lists: Iterable[Sequence[int]]) -> Sequence[int]:
+    lists = [postings for postings in lists if postings]
+    if len(lists) == 1:
+        return lists[0]
+    merged = set()
+    for postings in lists:
+        merged.update(postings)
+    return sorted(merged)
+
+
+def intersect(lists: List[Sequence[int]]) -> List[int]:
+    """Step numbers found in every list; walks the shortest one and binary searches the others."""
+    lists = sorted(lists, key=len)
+    found = []
+    for number in lists[0]:
+        for other in lists[1:]:
+            position = bisect_left(other, number)
+            if position == len(other) or other[position] != number:
+                break
+        else:
+            found.append(number)
+    return found
+
+
+class TraceIndex:
+    def __init__(self):
+        self.types: Dict[StepType, array] = {}
+        self.cells: Dict[Tuple[int, int], array] = {}
+        self.rows: Dict[int, array] = {}
+        self.nodes: Dict[str, array] = {}
+        self.edges: Dict[Tuple[str, str], array] = {}
+        self._count = 0
+
+    @property
+    def size(self) -> int:
+        indexes = (self.types, self.cells, self.rows, self.nodes, self.edges)
+        return sum(postings.itemsize * len(postings) for index in indexes for postings in index.values())
+
+    @staticmethod
+    def _file(index: Dict[Hashable, array], key: Hashable, number: int):
+        postings = index.get(key)
+        if postings is None:
+            postings = index[key] = array("l")
+        # A step naming the same key twice is filed once
+        if not postings or postings[-1] != number:
+            postings.append(number)
+
+    def add(self, step: Step):
+        # Runs once per stored step, so it sticks to plain lookups
+        number = self._count
+        self._count += 1
+        data = step.data
+        file = self._file
+        file(self.types, step.type, number)
+
+        row = data.get("i")
+        if type(row) is int:
+            col = data.get("j")
+            if type(col) is int:
+                file(self.cells, (row, col), number)
+            if "row" in data:
+                file(self.rows, row, number)
+        cell = data.get("cell") or data.get("active_cell")
+        if type(cell) is dict and type(cell.get("r")) is int and type(cell.get("c")) is int:
+            file(self.cells, (cell["r"], cell["c"]), number)
+        if "cells" in data:
+            for cell in data["cells"]:
+                if type(cell) is dict and type(cell.get("i")) is int and type(cell.get("j")) is int:
+                    file(self.cells, (cell["i"], cell["j"]), number)
+
+        if not GRAPH_KEYS.isdisjoint(data):
+            for key in NODE_KEYS:
+                node = data.get(key)
+                if node is not None and type(node) in (str, int):
+                    file(self.nodes, str(node), number)
+            for u, v in EDGE_KEYS:
+                if data.get(u) is not None and data.get(v) is not None:
+                    file(self.edges, edge_key(data[u], data[v]), number)
+
+    def query(self, types: Optional[List[StepType]] = None, cell: Optional[Tuple[int, int]] = None,
+              nodes: Optional[List[str]] = None, edges: Optional[List[Tuple[str, str]]] = None) -> Sequence[int]:
+        """Ascending step numbers matching every given filter (all steps when none is given)."""
+        filters = []
+        if types:
+            filters.append(merge(self.types.get(StepType(value), ()) for value in types))
+        if cell is not None:
+            filters.append(merge([self.cells.get(cell, ()), self.rows.get(cell[0], ())]))
+        if nodes:
+            filters.append(merge(self.nodes.get(str(node), ()) for node in nodes))
+        if edges:
+            filters.append(merge(self.edges.get(edge_key(u, v), ()) for u, v in edges))
+        if not filters:
+            return range(self._count)
+        return filters[0] if len(filters) == 1 else intersect(filters)
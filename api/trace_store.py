@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from api.keyframes import DEFAULT_KEYFRAME_STEPS, KeyframeIndex, TraceState
+from api.models import Step
+from api.trace_index import TraceIndex
+from api.tracing import StepTrace, build_metrics, drain
+
+# Bounded in-memory store for finished traces, so clients can fetch the summary
+# right away and page through steps later. Entries are evicted least recently
+# used first once the total size goes over TRACE_STORE_MAX_BYTES, and expire
+# TRACE_STORE_TTL seconds after they were last read.
+TRACE_STORE_MAX_BYTES = int(os.environ.get("TRACE_STORE_MAX_BYTES", 256 * 1024 * 1024))
+TRACE_STORE_TTL = float(os.environ.get("TRACE_STORE_TTL", 15 * 60))
+DEFAULT_PAGE_STEPS = 500
+MAX_PAGE_STEPS = 10_000
+
+# Rough per-step bookkeeping cost (list slot + bytes object header)
+STEP_OVERHEAD_BYTES = 48
+
+
+class StoredTrace:
+    def __init__(self, trace_id: str, steps: List[bytes], summary: Dict[str, Any],
+                 keyframes: Optional[KeyframeIndex] = None, index: Optional[TraceIndex] = None):
+        self.id = trace_id
+        # Each step is kept as its serialized JSON, so a page is a plain join
+        self.steps = steps
+        self.summary = summary
+        self.keyframes = keyframes or KeyframeIndex()
+        self.index = index or TraceIndex()
+        self.size = (sum(len(step) for step in steps) + STEP_OVERHEAD_BYTES * len(steps)
+                     + self.keyframes.size + self.index.size)
+        self.last_access = time.time()
+
+    def page(self, offset: int, limit: int) -> bytes:
+        return b"[" + b",".join(self.steps[offset:offset + limit]) + b"]"
+
+    def select(self, numbers: Sequence[int]) -> bytes:
+        return b"[" + b",".join(self.steps[number] for number in numbers) + b"]"
+
+    def state_at(self, step: int) -> Tuple[int, TraceState]:
+        """Rebuilds the visualizer state after `step` from the nearest keyframe."""
+        keyframe, state = self.keyframes.seek(step)
+        for raw in self.steps[keyframe + 1:step + 1]:
+            state.apply(Step.model_validate_json(raw))
+        return keyframe, state
+
+
+class TraceTooLarge(Exception):
+    pass
+
+
+def store_flag(value: Optional[str]) -> bool:
+    """Whether a ?store= value asks for the trace to be kept."""
+    return (value or "").lower() in ("1", "true", "yes")
+
+
+class TraceStore:
+    def __init__(self, max_bytes: int = TRACE_STORE_MAX_BYTES, ttl: float = TRACE_STORE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._traces: "OrderedDict[str, StoredTrace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    def _drop(self, trace_id: str):
+        trace = self._traces.pop(trace_id)
+        self.size -= trace.size
+
+    def _expire(self, now: float):
+        for trace_id, trace in list(self._traces.items()):
+            if now - trace.last_access > self.ttl:
+                self._drop(trace_id)
+
+    def put(self, steps: List[bytes], summary: Dict[str, Any], keyframes: Optional[KeyframeIndex] = None,
+            index: Optional[TraceIndex] = None) -> StoredTrace:
+        trace = StoredTrace(uuid.uuid4().hex, steps, summary, keyframes, index)
+        if trace.size > self.max_bytes:
+            raise TraceTooLarge(f"Trace needs {trace.size} bytes, store holds at most {self.max_bytes}")
+        with self._lock:
+            self._expire(trace.last_access)
+            while self._traces and self.size + trace.size > self.max_bytes:
+                self._drop(next(iter(self._traces)))
+            self._traces[trace.id] = trace
+            self.size += trace.size
+        return trace
+
+    def get(self, trace_id: str) -> Optional[StoredTrace]:
+        now = time.time()
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return None
+            if now - trace.last_access > self.ttl:
+                self._drop(trace_id)
+                return None
+            trace.last_access = now
+            self._traces.move_to_end(trace_id)
+            return trace
+
+
+trace_store = TraceStore()
+
+
+def store_trace(trace: StepTrace, store: TraceStore = trace_store, keyframe_steps: int = DEFAULT_KEYFRAME_STEPS) -> StoredTrace:
+    """
+    Runs a solver straight into the store, serializing each step as it is
+    produced and taking keyframes along the way for GET /traces/{id}/state,
+    and indexing it for GET /traces/{id}/query. Raises TraceTooLarge as soon
+    as the serialized steps alone outgrow the store, without running the
+    solver to the end.
+    """
+    start_time = time.time()
+    steps: List[bytes] = []
+    keyframes = KeyframeIndex(keyframe_steps)
+    index = TraceIndex()
+    context: Dict[str, Any] = {}
+    size = 0
+
+    def record(step: Step):
+        nonlocal size
+        raw = step.render().model_dump_json().encode()
+        size += len(raw) + STEP_OVERHEAD_BYTES
+        if size > store.max_bytes:
+            raise TraceTooLarge(f"Trace needs more than the {store.max_bytes} bytes the store holds")
+        steps.append(raw)
+        keyframes.add(step)
+        index.add(step)
+        if step.context:
+            context.update(step.context)
+
+    summary = drain(trace, record)
+    metrics = build_metrics(summary, time.time() - start_time, len(steps))
+    return store.put(steps, {
+        "result_value": summary.result_value,
+        "selected_items": summary.selected_items,
+        "metrics": metrics.model_dump(),
+        "keyframes": keyframes.steps,
+        "context": context,
+    }, keyframes, index)
@@ -1,21 +1,34 @@
-import time
 from typing import List
-from app.models import AlgorithmResult, Step, StepType, Metrics
+from app.models import AlgorithmResult, StepType, ResultSummary, TraceDetail, TraceRecorder
+from app.descriptions import register_templates
+from app.tracing import StepTrace, run_trace
 from pydantic import BaseModel
 
+register_templates({
+    "coin_change.amount": "Computing minimum coins for amount {0}",
+    "coin_change.use_coin": "Using coin {0}: dp[{1}] = dp[{2}] + 1 = {3}",
+})
+
 
 class CoinChangeInput(BaseModel):
     amount: int
     coins: List[int]
 
 
-def solve_coin_change_dp(data: CoinChangeInput) -> AlgorithmResult:
+def solve_coin_change_dp(data: CoinChangeInput, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_coin_change_dp(data, detail))
+
+
+def solve_coin_change_greedy(data: CoinChangeInput, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_coin_change_greedy(data, detail))
+
+
+def iter_coin_change_dp(data: CoinChangeInput, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
     """
     DP Solution: Minimum number of coins to make amount
     dp[i] = minimum coins needed to make amount i
     """
-    start_time = time.time()
-    steps = []
+    record = TraceRecorder(detail)
     amount = data.amount
     coins = data.coins
     
@@ -23,36 +36,47 @@ def solve_coin_change_dp(data: CoinChangeInput) -> AlgorithmResult:
     dp = [float('inf')] * (amount + 1)
     dp[0] = 0
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized DP array of size {amount + 1}. dp[0] = 0, rest = ∞",
-        data={"rows": 1, "cols": amount + 1}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized DP array of size {amount + 1}. dp[0] = 0, rest = ∞",
+            data={"rows": 1, "cols": amount + 1}
+        )
     
     # Fill DP table
     for i in range(1, amount + 1):
-        steps.append(Step(
-            type=StepType.HIGHLIGHT,
-            description=f"Computing minimum coins for amount {i}",
-            data={"i": 0, "j": i}
-        ))
+        if record.cells:
+            yield record.step(
+                type=StepType.HIGHLIGHT,
+                template="coin_change.amount", args=[i],
+                data={"i": 0, "j": i}
+            )
         
         for coin in coins:
             if coin <= i and dp[i - coin] != float('inf'):
                 new_val = dp[i - coin] + 1
                 if new_val < dp[i]:
                     dp[i] = new_val
-                    steps.append(Step(
-                        type=StepType.UPDATE,
-                        description=f"Using coin {coin}: dp[{i}] = dp[{i - coin}] + 1 = {new_val}",
-                        data={
-                            "i": 0,
-                            "j": i,
-                            "value": new_val,
-                            "coin_used": coin,
-                            "prev_j": i - coin
-                        }
-                    ))
+                    if record.cells:
+                        yield record.step(
+                            type=StepType.UPDATE,
+                            template="coin_change.use_coin", args=[coin, i, i - coin, new_val],
+                            decisive=True,
+                            data={
+                                "i": 0,
+                                "j": i,
+                                "value": new_val,
+                                "coin_used": coin,
+                                "prev_j": i - coin
+                            }
+                        )
+
+        if record.rows:
+            yield record.step(
+                type=StepType.UPDATE,
+                description=f"Minimum coins for amount {i}: {dp[i] if dp[i] != float('inf') else '∞'}",
+                data={"i": 0, "j": i, "value": dp[i]}
+            )
     
     result_value = dp[amount] if dp[amount] != float('inf') else -1
     
@@ -65,42 +89,36 @@ def solve_coin_change_dp(data: CoinChangeInput) -> AlgorithmResult:
                 if current >= coin and dp[current - coin] == dp[current] - 1:
                     selected_coins.append(coin)
                     current -= coin
-                    steps.append(Step(
-                        type=StepType.SOLUTION,
-                        description=f"Backtracking: Used coin {coin}",
-                        data={"coin": coin, "remaining": current}
-                    ))
+                    if record.key:
+                        yield record.step(
+                            type=StepType.SOLUTION,
+                            description=f"Backtracking: Used coin {coin}",
+                            data={"coin": coin, "remaining": current}
+                        )
                     break
     
-    end_time = time.time()
-    
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=result_value,
         selected_items=selected_coins,
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity=f"O({amount})",
-            time_complexity=f"O({amount} * {len(coins)})",
-            step_count=len(steps)
-        )
+        space_complexity=f"O({amount})",
+        time_complexity=f"O({amount} * {len(coins)})"
     )
 
 
-def solve_coin_change_greedy(data: CoinChangeInput) -> AlgorithmResult:
+def iter_coin_change_greedy(data: CoinChangeInput, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
     """
     Greedy Solution: Largest coin first (may not give optimal solution)
     """
-    start_time = time.time()
-    steps = []
+    record = TraceRecorder(detail)
     amount = data.amount
     coins = sorted(data.coins, reverse=True)
     
-    steps.append(Step(
-        type=StepType.SORT,
-        description=f"Sorted coins in descending order: {coins}",
-        data={"sorted_coins": coins}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.SORT,
+            description=f"Sorted coins in descending order: {coins}",
+            data={"sorted_coins": coins}
+        )
     
     remaining = amount
     selected_coins = []
@@ -113,21 +131,22 @@ def solve_coin_change_greedy(data: CoinChangeInput) -> AlgorithmResult:
             selected_coins.extend([coin] * count)
             total_coins += count
             
-            steps.append(Step(
-                type=StepType.PICK,
-                description=f"Picked {count} coin(s) of value {coin}. Remaining: {remaining}",
-                data={
-                    "item_id": coin,
-                    "weight": coin,
-                    "value": coin,
-                    "ratio": 1.0,
-                    "count": count,
-                    "current_weight": amount - remaining,
-                    "total_value": total_coins
-                }
-            ))
-        else:
-            steps.append(Step(
+            if record.key:
+                yield record.step(
+                    type=StepType.PICK,
+                    description=f"Picked {count} coin(s) of value {coin}. Remaining: {remaining}",
+                    data={
+                        "item_id": coin,
+                        "weight": coin,
+                        "value": coin,
+                        "ratio": 1.0,
+                        "count": count,
+                        "current_weight": amount - remaining,
+                        "total_value": total_coins
+                    }
+                )
+        elif record.key:
+            yield record.step(
                 type=StepType.REJECT,
                 description=f"Coin {coin} too large for remaining amount {remaining}",
                 data={
@@ -137,27 +156,20 @@ def solve_coin_change_greedy(data: CoinChangeInput) -> AlgorithmResult:
                     "ratio": 1.0,
                     "current_weight": amount - remaining
                 }
-            ))
+            )
     
     result_value = total_coins if remaining == 0 else -1
     
-    if remaining > 0:
-        steps.append(Step(
+    if remaining > 0 and record.key:
+        yield record.step(
             type=StepType.SOLUTION,
             description=f"Greedy failed: Cannot make exact amount (remaining: {remaining})",
             data={"success": False, "remaining": remaining}
-        ))
-    
-    end_time = time.time()
+        )
     
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=result_value,
         selected_items=selected_coins if remaining == 0 else [],
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity="O(1)",
-            time_complexity=f"O({len(coins)} log {len(coins)})",
-            step_count=len(steps)
-        )
+        space_complexity="O(1)",
+        time_complexity=f"O({len(coins)} log {len(coins)})"
     )
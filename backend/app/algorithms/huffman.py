@@ -1,9 +1,10 @@
 
 import heapq
-import time
 from collections import Counter
 from typing import List, Optional, Dict
-from app.models import AlgorithmResult, Step, StepType, Metrics, HuffmanInput
+from app.models import AlgorithmResult, StepType, ResultSummary, HuffmanInput, TraceDetail, TraceRecorder
+from app.context import context_ref
+from app.tracing import StepTrace, run_trace
 
 class HuffmanNode:
     def __init__(self, char: Optional[str], freq: int):
@@ -17,43 +18,43 @@ class HuffmanNode:
     def __lt__(self, other):
         return self.freq < other.freq
 
-def solve_huffman(data: HuffmanInput) -> AlgorithmResult:
-    start_time = time.time()
-    steps = []
+def solve_huffman(data: HuffmanInput, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_huffman(data, detail))
+
+def iter_huffman(data: HuffmanInput, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    record = TraceRecorder(detail)
     text = data.text
     
     # 1. Frequency Count
     if not text:
-         return AlgorithmResult(
-            steps=[],
+         return ResultSummary(
             result_value=0,
             selected_items=[],
-            metrics=Metrics(
-                time_taken=0,
-                space_complexity="O(1)",
-                time_complexity="O(1)",
-                step_count=0
-            )
+            space_complexity="O(1)",
+            time_complexity="O(1)"
         )
 
     freq_map = Counter(text)
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Calculated frequencies for text: '{text}'",
-        data={"frequencies": dict(freq_map)}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Calculated frequencies for the {len(text)} characters of the input text",
+            data={"frequencies": dict(freq_map), "text": context_ref("text")},
+            context={"text": text}
+        )
 
     # 2. Priority Queue
     pq = [HuffmanNode(char, freq) for char, freq in freq_map.items()]
     heapq.heapify(pq)
     
     initial_nodes = [{"id": node.id, "char": node.char, "freq": node.freq} for node in pq]
-    steps.append(Step(
-        type=StepType.INIT,
-        description="Initialized Priority Queue with leaf nodes.",
-        data={"nodes": initial_nodes}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description="Initialized Priority Queue with leaf nodes.",
+            data={"nodes": initial_nodes}
+        )
 
     # 3. Build Tree
     while len(pq) > 1:
@@ -61,16 +62,17 @@ def solve_huffman(data: HuffmanInput) -> AlgorithmResult:
         left = heapq.heappop(pq)
         right = heapq.heappop(pq)
         
-        steps.append(Step(
-            type=StepType.HIGHLIGHT,
-            description=f"Selected two smallest nodes: '{left.char or 'Internal'}' ({left.freq}) and '{right.char or 'Internal'}' ({right.freq})",
-            data={
-                "left_id": left.id, 
-                "right_id": right.id,
-                "left_freq": left.freq,
-                "right_freq": right.freq
-            }
-        ))
+        if record.cells:
+            yield record.step(
+                type=StepType.HIGHLIGHT,
+                description=f"Selected two smallest nodes: '{left.char or 'Internal'}' ({left.freq}) and '{right.char or 'Internal'}' ({right.freq})",
+                data={
+                    "left_id": left.id, 
+                    "right_id": right.id,
+                    "left_freq": left.freq,
+                    "right_freq": right.freq
+                }
+            )
 
         # Merge
         merged = HuffmanNode(None, left.freq + right.freq)
@@ -79,17 +81,19 @@ def solve_huffman(data: HuffmanInput) -> AlgorithmResult:
         
         heapq.heappush(pq, merged)
         
-        steps.append(Step(
-            type=StepType.UPDATE,
-            description=f"Merged into new internal node with frequency {merged.freq}",
-            data={
-                "new_node_id": merged.id,
-                "freq": merged.freq,
-                "left_child_id": left.id,
-                "right_child_id": right.id,
-                "remaining_count": len(pq)
-            }
-        ))
+        if record.rows or record.cells:
+            yield record.step(
+                type=StepType.UPDATE,
+                description=f"Merged into new internal node with frequency {merged.freq}",
+                decisive=True,
+                data={
+                    "new_node_id": merged.id,
+                    "freq": merged.freq,
+                    "left_child_id": left.id,
+                    "right_child_id": right.id,
+                    "remaining_count": len(pq)
+                }
+            )
 
     root = pq[0]
     
@@ -108,26 +112,20 @@ def solve_huffman(data: HuffmanInput) -> AlgorithmResult:
 
     generate_codes(root, "")
     
-    steps.append(Step(
-        type=StepType.SOLUTION,
-        description="Huffman Codes Generated",
-        data={"codes": codes}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description="Huffman Codes Generated",
+            data={"codes": codes}
+        )
     
     # Calculate total bits
     total_bits = sum(freq_map[char] * len(code) for char, code in codes.items())
     original_bits = len(text) * 8 # Assuming ASCII/UTF-8 byte is 8 bits for simplicity in comparison
 
-    end_time = time.time()
-
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=total_bits, # Use result_value to return total bits
         selected_items=[], 
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity="O(K) where K is unique chars",
-            time_complexity="O(N log K) where N is text length",
-            step_count=len(steps)
-        )
+        space_complexity="O(K) where K is unique chars",
+        time_complexity="O(N log K) where N is text length"
     )
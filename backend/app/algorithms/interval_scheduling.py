@@ -1,6 +1,6 @@
-import time
 from typing import List
-from app.models import AlgorithmResult, Step, StepType, Metrics
+from app.models import AlgorithmResult, StepType, ResultSummary, TraceDetail, TraceRecorder
+from app.tracing import StepTrace, run_trace
 from pydantic import BaseModel
 
 
@@ -14,35 +14,44 @@ class IntervalSchedulingInput(BaseModel):
     intervals: List[Interval]
 
 
-def solve_interval_scheduling_greedy(data: IntervalSchedulingInput) -> AlgorithmResult:
+def solve_interval_scheduling_greedy(data: IntervalSchedulingInput, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_interval_scheduling_greedy(data, detail))
+
+
+def solve_interval_scheduling_dp(data: IntervalSchedulingInput, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_interval_scheduling_dp(data, detail))
+
+
+def iter_interval_scheduling_greedy(data: IntervalSchedulingInput, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
     """
     Greedy Solution: Select maximum non-overlapping intervals
     Sort by end time and greedily pick non-conflicting intervals
     This is optimal for this problem!
     """
-    start_time = time.time()
-    steps = []
+    record = TraceRecorder(detail)
     intervals = data.intervals
     
     # Sort by end time
     sorted_intervals = sorted(intervals, key=lambda x: x.end)
     
-    steps.append(Step(
-        type=StepType.SORT,
-        description=f"Sorted {len(intervals)} intervals by end time (earliest finish first)",
-        data={"sorted_order": [f"[{i.start},{i.end}]" for i in sorted_intervals]}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.SORT,
+            description=f"Sorted {len(intervals)} intervals by end time (earliest finish first)",
+            data={"sorted_order": [f"[{i.start},{i.end}]" for i in sorted_intervals]}
+        )
     
     selected = []
     last_end = -1
     total_selected = 0
     
     for interval in sorted_intervals:
-        steps.append(Step(
-            type=StepType.HIGHLIGHT,
-            description=f"Considering interval [{interval.start}, {interval.end}]",
-            data={"interval_id": interval.id, "start": interval.start, "end": interval.end}
-        ))
+        if record.cells:
+            yield record.step(
+                type=StepType.HIGHLIGHT,
+                description=f"Considering interval [{interval.start}, {interval.end}]",
+                data={"interval_id": interval.id, "start": interval.start, "end": interval.end}
+            )
         
         if interval.start >= last_end:
             # No overlap, select this interval
@@ -50,74 +59,70 @@ def solve_interval_scheduling_greedy(data: IntervalSchedulingInput) -> Algorithm
             last_end = interval.end
             total_selected += 1
             
-            steps.append(Step(
-                type=StepType.PICK,
-                description=f"Selected interval [{interval.start}, {interval.end}]. No overlap with previous.",
-                data={
-                    "item_id": interval.id,
-                    "weight": interval.start,
-                    "value": interval.end,
-                    "ratio": interval.end - interval.start,
-                    "current_weight": last_end,
-                    "total_value": total_selected
-                }
-            ))
+            if record.key:
+                yield record.step(
+                    type=StepType.PICK,
+                    description=f"Selected interval [{interval.start}, {interval.end}]. No overlap with previous.",
+                    data={
+                        "item_id": interval.id,
+                        "weight": interval.start,
+                        "value": interval.end,
+                        "ratio": interval.end - interval.start,
+                        "current_weight": last_end,
+                        "total_value": total_selected
+                    }
+                )
         else:
             # Overlaps, reject
-            steps.append(Step(
-                type=StepType.REJECT,
-                description=f"Rejected interval [{interval.start}, {interval.end}]. Overlaps with previous (ends at {last_end}).",
-                data={
-                    "item_id": interval.id,
-                    "weight": interval.start,
-                    "value": interval.end,
-                    "ratio": interval.end - interval.start,
-                    "current_weight": last_end
-                }
-            ))
-    
-    end_time = time.time()
+            if record.key:
+                yield record.step(
+                    type=StepType.REJECT,
+                    description=f"Rejected interval [{interval.start}, {interval.end}]. Overlaps with previous (ends at {last_end}).",
+                    data={
+                        "item_id": interval.id,
+                        "weight": interval.start,
+                        "value": interval.end,
+                        "ratio": interval.end - interval.start,
+                        "current_weight": last_end
+                    }
+                )
     
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=total_selected,
         selected_items=selected,
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity="O(1)",
-            time_complexity=f"O(N log N)",
-            step_count=len(steps)
-        )
+        space_complexity="O(1)",
+        time_complexity=f"O(N log N)"
     )
 
 
-def solve_interval_scheduling_dp(data: IntervalSchedulingInput) -> AlgorithmResult:
+def iter_interval_scheduling_dp(data: IntervalSchedulingInput, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
     """
     DP Solution: Also finds maximum non-overlapping intervals
     Shows that DP gives same result as greedy for this problem
     """
-    start_time = time.time()
-    steps = []
+    record = TraceRecorder(detail)
     intervals = data.intervals
     n = len(intervals)
     
     # Sort by end time
     sorted_intervals = sorted(intervals, key=lambda x: x.end)
     
-    steps.append(Step(
-        type=StepType.SORT,
-        description=f"Sorted {n} intervals by end time for DP solution",
-        data={"sorted_order": [f"[{i.start},{i.end}]" for i in sorted_intervals]}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.SORT,
+            description=f"Sorted {n} intervals by end time for DP solution",
+            data={"sorted_order": [f"[{i.start},{i.end}]" for i in sorted_intervals]}
+        )
     
     # dp[i] = maximum intervals we can select from first i intervals
     dp = [0] * (n + 1)
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized DP array of size {n + 1}",
-        data={"rows": 1, "cols": n + 1}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized DP array of size {n + 1}",
+            data={"rows": 1, "cols": n + 1}
+        )
     
     # For tracking which intervals were selected
     selected = [[] for _ in range(n + 1)]
@@ -134,51 +139,48 @@ def solve_interval_scheduling_dp(data: IntervalSchedulingInput) -> AlgorithmResu
         include_val = 1 + dp[j]
         exclude_val = dp[i - 1]
         
-        steps.append(Step(
-            type=StepType.HIGHLIGHT,
-            description=f"DP[{i}]: Interval [{current.start},{current.end}]. Include={include_val}, Exclude={exclude_val}",
-            data={"i": 0, "j": i}
-        ))
+        if record.cells:
+            yield record.step(
+                type=StepType.HIGHLIGHT,
+                description=f"DP[{i}]: Interval [{current.start},{current.end}]. Include={include_val}, Exclude={exclude_val}",
+                data={"i": 0, "j": i}
+            )
         
         if include_val > exclude_val:
             dp[i] = include_val
             selected[i] = selected[j] + [current.id]
-            steps.append(Step(
-                type=StepType.UPDATE,
-                description=f"Include interval {current.id}: {include_val} > {exclude_val}",
-                data={
-                    "i": 0,
-                    "j": i,
-                    "value": include_val,
-                    "action": "include",
-                    "prev_j": j
-                }
-            ))
+            if record.rows or record.cells:
+                yield record.step(
+                    type=StepType.UPDATE,
+                    description=f"Include interval {current.id}: {include_val} > {exclude_val}",
+                    decisive=True,
+                    data={
+                        "i": 0,
+                        "j": i,
+                        "value": include_val,
+                        "action": "include",
+                        "prev_j": j
+                    }
+                )
         else:
             dp[i] = exclude_val
             selected[i] = selected[i - 1]
-            steps.append(Step(
-                type=StepType.UPDATE,
-                description=f"Exclude interval {current.id}: {exclude_val} >= {include_val}",
-                data={
-                    "i": 0,
-                    "j": i,
-                    "value": exclude_val,
-                    "action": "exclude",
-                    "prev_j": i - 1
-                }
-            ))
+            if record.rows or record.cells:
+                yield record.step(
+                    type=StepType.UPDATE,
+                    description=f"Exclude interval {current.id}: {exclude_val} >= {include_val}",
+                    data={
+                        "i": 0,
+                        "j": i,
+                        "value": exclude_val,
+                        "action": "exclude",
+                        "prev_j": i - 1
+                    }
+                )
     
-    end_time = time.time()
-    
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=dp[n],
         selected_items=selected[n],
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity=f"O(N)",
-            time_complexity=f"O(N²)",
-            step_count=len(steps)
-        )
+        space_complexity=f"O(N)",
+        time_complexity=f"O(N²)"
     )
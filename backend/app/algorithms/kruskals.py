@@ -1,6 +1,7 @@
-import time
 from typing import Dict, List, Any
-from app.models import Step, StepType, AlgorithmResult, Metrics, DijkstraInput
+from app.models import StepType, AlgorithmResult, ResultSummary, DijkstraInput, TraceDetail, TraceRecorder
+from app.context import context_ref
+from app.tracing import StepTrace, run_trace
 
 class UnionFind:
     def __init__(self, nodes):
@@ -27,10 +28,11 @@ class UnionFind:
             return True
         return False
 
-def solve_kruskals(data: DijkstraInput) -> AlgorithmResult:
-    start_time = time.time()
-    steps = []
-    
+def solve_kruskals(data: DijkstraInput, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_kruskals(data, detail))
+
+def iter_kruskals(data: DijkstraInput, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    record = TraceRecorder(detail)
     graph = data.graph
     
     # Extract all edges: (weight, u, v)
@@ -49,68 +51,65 @@ def solve_kruskals(data: DijkstraInput) -> AlgorithmResult:
     # Sort edges by weight
     edges.sort()
     
-    steps.append(Step(
-        type=StepType.SORT,
-        description=f"Sorted {len(edges)} edges by weight",
-        data={
-            "edges": [{"u": u, "v": v, "weight": w} for w, u, v in edges],
-            "graph": graph
-        }
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.SORT,
+            description=f"Sorted {len(edges)} edges by weight",
+            data={
+                "edges": [{"u": u, "v": v, "weight": w} for w, u, v in edges],
+                "graph": context_ref("graph")
+            },
+            context={"graph": graph}
+        )
     
     uf = UnionFind(graph.keys())
     mst_weight = 0
     mst_edges = []
     
     for w, u, v in edges:
-        steps.append(Step(
-            type=StepType.HIGHLIGHT,
-            description=f"Checking edge {u}-{v} (weight {w})",
-            data={
-                "u": u, 
-                "v": v, 
-                "weight": w,
-                "current_node": u,
-                "checking_neighbor": v
-            }
-        ))
+        if record.cells:
+            yield record.step(
+                type=StepType.HIGHLIGHT,
+                description=f"Checking edge {u}-{v} (weight {w})",
+                data={
+                    "u": u, 
+                    "v": v, 
+                    "weight": w,
+                    "current_node": u,
+                    "checking_neighbor": v
+                }
+            )
         
         if uf.union(u, v):
             mst_weight += w
             mst_edges.append({"u": u, "v": v, "weight": w})
             
-            steps.append(Step(
-                type=StepType.PICK,
-                description=f"Added edge {u}-{v} to MST. No cycle detected.",
-                data={
-                    "u": u,
-                    "v": v, 
-                    "weight": w,
-                    "mst_edges": mst_edges
-                }
-            ))
-        else:
-            steps.append(Step(
+            if record.key:
+                yield record.step(
+                    type=StepType.PICK,
+                    description=f"Added edge {u}-{v} to MST. No cycle detected.",
+                    data={
+                        "u": u,
+                        "v": v, 
+                        "weight": w,
+                        "mst_edges": list(mst_edges)
+                    }
+                )
+        elif record.key:
+            yield record.step(
                 type=StepType.REJECT,
                 description=f"Skipped edge {u}-{v}. Cycle detected.",
                 data={
                     "u": u,
                     "v": v,
                     "weight": w,
-                    "mst_edges": mst_edges
+                    "mst_edges": list(mst_edges)
                 }
-            ))
+            )
             
-    end_time = time.time()
-    
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=mst_weight,
         selected_items=[],
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity=f"O(V)",
-            time_complexity=f"O(E log E)",
-            step_count=len(steps)
-        )
+        space_complexity=f"O(V)",
+        time_complexity=f"O(E log E)"
     )
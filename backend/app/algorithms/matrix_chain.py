@@ -1,9 +1,19 @@
 import sys
-from app.models import AlgorithmResult, Step, StepType, Metrics
-import time
+from app.models import AlgorithmResult, StepType, ResultSummary, TraceDetail, TraceRecorder
+from app.descriptions import register_templates
+from app.tracing import StepTrace, run_trace
 
-def solve_matrix_chain_dp(data):
-    start_time = time.time()
+register_templates({
+    "matrix_chain.chain": "Computing min cost for chain A{0}...A{1} (Length {2})",
+    "matrix_chain.split": "Checking split at k={0}: Cost = {1} + {2} + {3}*{4}*{5} = {6}",
+    "matrix_chain.best": "New min cost for A{0}...A{1} is {2} (Split at k={3})",
+})
+
+def solve_matrix_chain_dp(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_matrix_chain_dp(data, detail))
+
+def iter_matrix_chain_dp(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
+    record = TraceRecorder(detail)
     dims = data.dimensions
     n = len(dims) - 1  # Number of matrices
     
@@ -12,14 +22,13 @@ def solve_matrix_chain_dp(data):
     m = [[0 for _ in range(n + 1)] for _ in range(n + 1)]
     s = [[0 for _ in range(n + 1)] for _ in range(n + 1)]
     
-    steps = []
-    
     # Init step
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized DP table for {n} matrices.",
-        data={"rows": n + 1, "cols": n + 1, "dimensions": dims}
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized DP table for {n} matrices.",
+            data={"rows": n + 1, "cols": n + 1, "dimensions": dims}
+        )
 
     # l is chain length
     for l in range(2, n + 1):
@@ -27,42 +36,50 @@ def solve_matrix_chain_dp(data):
             j = i + l - 1
             m[i][j] = sys.maxsize
             
-            steps.append(Step(
-                type=StepType.HIGHLIGHT,
-                description=f"Computing min cost for chain A{i}...A{j} (Length {l})",
-                data={"i": i, "j": j}
-            ))
+            if record.cells:
+                yield record.step(
+                    type=StepType.HIGHLIGHT,
+                    template="matrix_chain.chain", args=[i, j, l],
+                    data={"i": i, "j": j}
+                )
             
             # Try every split k
             for k in range(i, j):
                 # cost = cost(left) + cost(right) + cost(multiplication)
                 q = m[i][k] + m[k+1][j] + dims[i-1] * dims[k] * dims[j]
                 
-                steps.append(Step(
-                    type=StepType.INFO,
-                    description=f"Checking split at k={k}: Cost = {m[i][k]} + {m[k+1][j]} + {dims[i-1]}*{dims[k]}*{dims[j]} = {q}",
-                    data={"i": i, "j": j, "k": k, "cost": q}
-                ))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.INFO,
+                        template="matrix_chain.split", args=[k, m[i][k], m[k+1][j], dims[i-1], dims[k], dims[j], q],
+                        data={"i": i, "j": j, "k": k, "cost": q}
+                    )
                 
                 if q < m[i][j]:
                     m[i][j] = q
                     s[i][j] = k
-                    steps.append(Step(
-                        type=StepType.UPDATE,
-                        description=f"New min cost for A{i}...A{j} is {q} (Split at k={k})",
-                        data={"i": i, "j": j, "value": q, "split": k}
-                    ))
-    
-    total_time = time.time() - start_time
+                    if record.cells:
+                        yield record.step(
+                            type=StepType.UPDATE,
+                            template="matrix_chain.best", args=[i, j, q, k],
+                            decisive=True,
+                            data={"i": i, "j": j, "value": q, "split": k}
+                        )
+
+        if record.rows:
+            chains = [(r, r + l - 1) for r in range(1, n - l + 2)]
+            yield record.step(
+                type=StepType.UPDATE,
+                description=f"Min costs for all chains of length {l} computed",
+                data={
+                    "length": l,
+                    "cells": [{"i": r, "j": c, "value": m[r][c], "split": s[r][c]} for r, c in chains]
+                }
+            )
     
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=m[1][n],
         selected_items=[], # Not used for this problem
-        metrics=Metrics(
-            time_taken=total_time,
-            space_complexity="O(n^2)",
-            time_complexity="O(n^3)",
-            step_count=len(steps)
-        )
+        space_complexity="O(n^2)",
+        time_complexity="O(n^3)"
     )
@@ -1,15 +1,23 @@
-import time
 from typing import List
-from app.models import Step, StepType, AlgorithmResult, Metrics
+from app.models import StepType, AlgorithmResult, ResultSummary, TraceDetail, TraceRecorder
+from app.descriptions import register_templates
+from app.context import context_ref
+from app.tracing import StepTrace, run_trace
 
-def solve_rod_cutting_dp(data) -> AlgorithmResult:
+register_templates({
+    "rod_cutting.consider": "For rod length {0}: considering cut of {1} (price {2}) + remaining {3}",
+    "rod_cutting.best": "New best for length {0}: cut {1} (${2}) + dp[{3}] (${4}) = ${5}",
+})
+
+def solve_rod_cutting_dp(data, detail: TraceDetail = TraceDetail.FULL) -> AlgorithmResult:
+    return run_trace(iter_rod_cutting_dp(data, detail))
+
+def iter_rod_cutting_dp(data, detail: TraceDetail = TraceDetail.FULL) -> StepTrace:
     """
     Rod Cutting Problem - DP Solution
     Given a rod of length n and prices for each piece length, find max profit.
     """
-    start_time = time.time()
-    steps = []
-    
+    record = TraceRecorder(detail)
     length = data.length
     prices = data.prices  # prices[i] = price for piece of length i+1
     
@@ -17,38 +25,50 @@ def solve_rod_cutting_dp(data) -> AlgorithmResult:
     dp = [0] * (length + 1)
     cuts = [0] * (length + 1)  # To track where to cut
     
-    steps.append(Step(
-        type=StepType.INIT,
-        description=f"Initialized DP array for rod of length {length}. prices = {prices}",
-        data={
-            "rows": 1,
-            "cols": length + 1,
-            "prices": prices
-        }
-    ))
+    if record.key:
+        yield record.step(
+            type=StepType.INIT,
+            description=f"Initialized DP array for rod of length {length} with {len(prices)} piece prices",
+            data={
+                "rows": 1,
+                "cols": length + 1,
+                "prices": context_ref("prices")
+            },
+            context={"prices": prices}
+        )
     
     # Fill DP table
     for i in range(1, length + 1):
         best = -float('inf')
         for j in range(1, i + 1):
             if j <= len(prices):
-                steps.append(Step(
-                    type=StepType.HIGHLIGHT,
-                    description=f"For rod length {i}: considering cut of {j} (price {prices[j-1]}) + remaining {i-j}",
-                    data={"i": 0, "j": i, "cut_length": j}
-                ))
+                if record.cells:
+                    yield record.step(
+                        type=StepType.HIGHLIGHT,
+                        template="rod_cutting.consider", args=[i, j, prices[j-1], i-j],
+                        data={"i": 0, "j": i, "cut_length": j}
+                    )
                 
                 if prices[j-1] + dp[i-j] > best:
                     best = prices[j-1] + dp[i-j]
                     cuts[i] = j
                     
-                    steps.append(Step(
-                        type=StepType.UPDATE,
-                        description=f"New best for length {i}: cut {j} (${prices[j-1]}) + dp[{i-j}] (${dp[i-j]}) = ${best}",
-                        data={"i": 0, "j": i, "value": best, "cut": j}
-                    ))
+                    if record.cells:
+                        yield record.step(
+                            type=StepType.UPDATE,
+                            template="rod_cutting.best", args=[i, j, prices[j-1], i-j, dp[i-j], best],
+                            decisive=True,
+                            data={"i": 0, "j": i, "value": best, "cut": j}
+                        )
         
         dp[i] = best
+
+        if record.rows:
+            yield record.step(
+                type=StepType.UPDATE,
+                description=f"Best revenue for length {i}: ${best} (first cut {cuts[i]})",
+                data={"i": 0, "j": i, "value": best, "cut": cuts[i]}
+            )
     
     # Backtrack to find the cuts
     result_cuts = []
@@ -57,22 +77,16 @@ def solve_rod_cutting_dp(data) -> AlgorithmResult:
         result_cuts.append(cuts[remaining])
         remaining -= cuts[remaining]
     
-    steps.append(Step(
-        type=StepType.SOLUTION,
-        description=f"Maximum Revenue: ${dp[length]}. Cuts: {result_cuts}",
-        data={"max_revenue": dp[length], "cuts": result_cuts, "dp": dp}
-    ))
-    
-    end_time = time.time()
+    if record.key:
+        yield record.step(
+            type=StepType.SOLUTION,
+            description=f"Maximum Revenue: ${dp[length]}. Cuts: {result_cuts}",
+            data={"max_revenue": dp[length], "cuts": result_cuts, "dp": dp}
+        )
     
-    return AlgorithmResult(
-        steps=steps,
+    return ResultSummary(
         result_value=dp[length],
         selected_items=result_cuts,
-        metrics=Metrics(
-            time_taken=end_time - start_time,
-            space_complexity="O(n)",
-            time_complexity="O(n²)",
-            step_count=len(steps)
-        )
+        space_complexity="O(n)",
+        time_complexity="O(n²)"
     )
@@ -0,0 +1,81 @@
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from app.models import AlgorithmType, RunSummary, SelectionDivergence, StepType, TraceDiff
+from app.tracing import StepTrace, drain
+
+# Server-side comparison of two algorithms on the same input (greedy vs DP).
+# Both traces are run to completion but never kept: only the step count, the
+# timing and, for every item, the first step that decided on it are recorded.
+# The selections are compared as multisets (coin change picks a coin value
+# more than once), and each item they disagree on is lined up with the step
+# where each run picked, rejected or backtracked over it.
+DECISION_STEPS = {StepType.PICK, StepType.REJECT, StepType.SOLUTION}
+# Data keys naming the item a decision step is about
+DECISION_KEYS = ("item_id", "coin")
+
+
+def profile_run(algorithm: AlgorithmType, trace: StepTrace) -> Tuple[RunSummary, Dict[int, int]]:
+    decided: Dict[int, int] = {}
+    step_count = 0
+
+    def record(step):
+        nonlocal step_count
+        if step.type in DECISION_STEPS:
+            for key in DECISION_KEYS:
+                item = step.data.get(key)
+                if isinstance(item, int) and item not in decided:
+                    decided[item] = step_count
+                    break
+        step_count += 1
+
+    start_time = time.time()
+    summary = drain(trace, record)
+    run = RunSummary(
+        algorithm=algorithm,
+        result_value=summary.result_value,
+        selected_items=summary.selected_items,
+        step_count=step_count,
+        time_taken=time.time() - start_time
+    )
+    return run, decided
+
+
+def _ratio(right: float, left: float) -> Optional[float]:
+    return right / left if left else None
+
+
+def diff_runs(problem: str, left: RunSummary, left_decided: Dict[int, int],
+              right: RunSummary, right_decided: Dict[int, int]) -> TraceDiff:
+    left_counts, right_counts = Counter(left.selected_items), Counter(right.selected_items)
+    common_items: List[int] = sorted((left_counts & right_counts).elements())
+    divergences = [
+        SelectionDivergence(
+            item=item,
+            left_count=left_counts[item],
+            right_count=right_counts[item],
+            left_step=left_decided.get(item),
+            right_step=right_decided.get(item)
+        )
+        for item in sorted(set(left_counts) | set(right_counts))
+        if left_counts[item] != right_counts[item]
+    ]
+    # Earliest disagreement in the left trace first
+    divergences.sort(key=lambda divergence: (divergence.left_step is None, divergence.left_step or 0, divergence.item))
+    return TraceDiff(
+        problem=problem,
+        left=left,
+        right=right,
+        result_gap=right.result_value - left.result_value,
+        step_ratio=_ratio(right.step_count, left.step_count),
+        time_ratio=_ratio(right.time_taken, left.time_taken),
+        common_items=common_items,
+        divergences=divergences
+    )
+
+
+def compare_traces(problem: str, left: AlgorithmType, left_trace: StepTrace,
+                   right: AlgorithmType, right_trace: StepTrace) -> TraceDiff:
+    left_run, left_decided = profile_run(left, left_trace)
+    right_run, right_decided = profile_run(right, right_trace)
+    return diff_runs(problem, left_run, left_decided, right_run, right_decided)
@@ -0,0 +1,199 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Type
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+from pydantic_core import to_json
+from starlette.concurrency import run_in_threadpool
+from app.context import collect_context
+from app.models import SnapshotMode, Step, TraceDetail
+from app.snapshots import DEFAULT_KEYFRAME_INTERVAL, delta_trace
+from app.tracing import StepTrace, build_metrics
+
+# Live traces push steps to the client with credit-based flow control:
+# the client starts with `window` credits, every step sent costs one, and the
+# client hands credits back by acknowledging steps it has consumed. When the
+# credit runs out the solver generator is simply not advanced, so it stays
+# suspended until the visualizer catches up.
+DEFAULT_LIVE_WINDOW = 256
+MAX_LIVE_WINDOW = 10_000
+# Upper bound on steps pulled from the solver per send
+LIVE_BATCH_STEPS = 64
+# Sessions created for the SSE transport that nobody connects to are dropped after this
+LIVE_SESSION_TTL = 300
+
+
+class LiveTrace:
+    def __init__(self, trace: StepTrace, window: int = DEFAULT_LIVE_WINDOW):
+        self.id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.credit = max(1, min(window, MAX_LIVE_WINDOW))
+        self.step_count = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.connected = False
+        self.cancelled = False
+        self._trace = trace
+        self._granted = asyncio.Event()
+        self._start_time: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def grant(self, count: int):
+        # Credits never exceed the maximum window, whatever the client sends
+        self.credit = min(self.credit + max(0, count), MAX_LIVE_WINDOW)
+        if self.credit > 0:
+            self._granted.set()
+
+    def cancel(self):
+        # Client went away: wake up a pending next_batch() so it can bail out
+        self.cancelled = True
+        self._granted.set()
+
+    def close(self):
+        try:
+            self._trace.close()
+        except ValueError:
+            # Still running in a worker thread (client vanished mid-batch);
+            # it gets garbage collected once that batch returns.
+            pass
+
+    def _pull(self, limit: int) -> List[Step]:
+        # Runs in a worker thread: advances the solver by at most `limit` steps
+        if self._start_time is None:
+            self._start_time = time.time()
+        steps = []
+        while len(steps) < limit:
+            try:
+                steps.append(next(self._trace))
+            except StopIteration as stop:
+                summary = stop.value
+                self.result = {
+                    "result_value": summary.result_value,
+                    "selected_items": summary.selected_items,
+                    "metrics": build_metrics(summary, time.time() - self._start_time, self.step_count + len(steps)).model_dump(),
+                }
+                break
+        return steps
+
+    async def next_batch(self) -> List[Step]:
+        """
+        Waits for credit, then returns the next batch of steps.
+        An empty list means the trace is finished (`result` is set) or cancelled.
+        """
+        while self.credit <= 0 and not self.cancelled:
+            self._granted.clear()
+            await self._granted.wait()
+        if self.cancelled:
+            return []
+        steps = await run_in_threadpool(self._pull, min(self.credit, LIVE_BATCH_STEPS))
+        self.credit -= len(steps)
+        self.step_count += len(steps)
+        return steps
+
+
+# Pending/active live sessions for the SSE transport, keyed by id
+LIVE_SESSIONS: Dict[str, LiveTrace] = {}
+
+
+def open_session(trace: StepTrace, window: int = DEFAULT_LIVE_WINDOW) -> LiveTrace:
+    now = time.time()
+    for live_id, live in list(LIVE_SESSIONS.items()):
+        if not live.connected and now - live.created_at > LIVE_SESSION_TTL:
+            LIVE_SESSIONS.pop(live_id).close()
+    live = LiveTrace(trace, window)
+    LIVE_SESSIONS[live.id] = live
+    return live
+
+
+def close_session(live_id: str):
+    live = LIVE_SESSIONS.pop(live_id, None)
+    if live is not None:
+        live.close()
+
+
+def _encode(message: Dict[str, Any]) -> str:
+    return to_json(message, inf_nan_mode="null").decode()
+
+
+def _encode_steps(steps: List[Step]) -> str:
+    message: Dict[str, Any] = {"steps": [step.render().model_dump() for step in steps]}
+    context = collect_context(steps)
+    if context:
+        message["context"] = context
+    return _encode(message)
+
+
+async def _receive_acks(websocket: WebSocket, live: LiveTrace):
+    try:
+        while True:
+            message = await websocket.receive_json()
+            live.grant(int(message.get("ack", 0)))
+    except (WebSocketDisconnect, ValueError, TypeError, AttributeError):
+        live.cancel()
+
+
+async def serve_websocket(websocket: WebSocket, input_model: Type[BaseModel], make_trace: Callable[[Any, TraceDetail], StepTrace]):
+    """
+    WebSocket protocol:
+      client -> {"input": {...}, "window": 256}   once, to start the solver
+                                                  (optional "detail": none/key/row/full,
+                                                   "snapshots": full/delta, "keyframe_every": N)
+      server -> {"steps": [...]}                  batches, never more than the granted credit
+                                                  (plus "context": {...} for the $refs they introduce)
+      client -> {"ack": n}                        any time, returns n credits
+      server -> {"result": {...}}                 after the last step, then closes
+    """
+    await websocket.accept()
+    try:
+        message = await websocket.receive_json()
+        data = input_model.model_validate(message.get("input"))
+        window = int(message.get("window", DEFAULT_LIVE_WINDOW))
+        detail = TraceDetail(message.get("detail", TraceDetail.FULL))
+        snapshots = SnapshotMode(message.get("snapshots", SnapshotMode.FULL))
+        keyframe_every = int(message.get("keyframe_every", DEFAULT_KEYFRAME_INTERVAL))
+    except (ValidationError, ValueError, TypeError, AttributeError) as e:
+        error = e.errors(include_url=False, include_context=False) if isinstance(e, ValidationError) else str(e)
+        await websocket.send_text(_encode({"error": error}))
+        await websocket.close(code=1008)
+        return
+    except WebSocketDisconnect:
+        return
+
+    trace = make_trace(data, detail)
+    if snapshots == SnapshotMode.DELTA:
+        trace = delta_trace(trace, keyframe_every)
+    live = LiveTrace(trace, window)
+    acks = asyncio.create_task(_receive_acks(websocket, live))
+    try:
+        while not live.done and not live.cancelled:
+            steps = await live.next_batch()
+            if steps:
+                await websocket.send_text(_encode_steps(steps))
+        if live.done:
+            await websocket.send_text(_encode({"result": live.result}))
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        acks.cancel()
+        live.close()
+
+
+async def iter_sse(live: LiveTrace):
+    """
+    Server-Sent Events fallback. Same flow control as the WebSocket, but the
+    credits come back through POST /live/{id}/ack since SSE is one-way.
+    """
+    live.connected = True
+    try:
+        while not live.done and not live.cancelled:
+            steps = await live.next_batch()
+            if steps:
+                yield f"event: steps\ndata: {_encode_steps(steps)}\n\n"
+        if live.done:
+            yield f"event: result\ndata: {_encode(live.result)}\n\n"
+    finally:
+        close_session(live.id)
@@ -0,0 +1,280 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Content-addressed cache of finished /solve responses.
+# The key is a hash of what determines the response: the route (problem and
+# variant), the validated input in its canonical JSON form (so formatting,
+# whitespace and field order of the request don't matter; free-form dicts such
+# as a graph keep their order, which the solvers depend on), the detail level,
+# the other response options and the negotiated representation. The value is
+# the encoded body, so a hit skips the solver and the serialization entirely.
+# Bounded by the total size of the cached bodies, evicting least recently used.
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+
+# Optional second tier shared by every worker process on the host (and kept
+# across restarts / cold starts): an SQLite file at RESULT_CACHE_PATH holding
+# the bodies compressed, bounded by RESULT_CACHE_DISK_MAX_BYTES of compressed
+# data. Off unless the path is set; on Vercel it has to live under /tmp.
+RESULT_CACHE_PATH = os.environ.get("RESULT_CACHE_PATH")
+RESULT_CACHE_DISK_MAX_BYTES = int(os.environ.get("RESULT_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+# A hit only rewrites the entry's access time when it is older than this, so
+# reads rarely need the database's write lock
+DISK_TOUCH_SECONDS = 60
+DISK_BUSY_TIMEOUT = 2.0
+
+
+def cache_key(parts: Iterable[bytes]) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CachedResponse:
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.media_type = media_type
+
+
+def _compress(body: bytes):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(body)
+    return "zlib", zlib.compress(body, 6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class DiskResultCache:
+    """
+    SQLite-backed store of cached responses. Each thread of each process opens
+    its own connection; SQLite's file locking (in WAL mode, so readers never
+    wait for a writer) keeps concurrent workers consistent. Writes that cannot
+    get the lock within DISK_BUSY_TIMEOUT are skipped and failed reads count as
+    misses: the cache never fails a request. That includes a file that cannot
+    be opened at all, which leaves every lookup a miss. The total size of the
+    entries is kept in the one-row `meta` table, updated in the same
+    transaction as the entries, so writes never scan the whole table.
+    """
+
+    def __init__(self, path: str, max_bytes: int = RESULT_CACHE_DISK_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._local = threading.local()
+        # Opening it here only surfaces a bad path early (in stats); it is
+        # retried on use
+        try:
+            self._connection()
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily, so a connection is never shared across a fork; only
+        # ever called inside the sqlite3.Error handling of its callers
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=DISK_BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    media_type TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+                CREATE TABLE IF NOT EXISTS meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    size INTEGER NOT NULL
+                );
+            """)
+            if connection.execute("SELECT 1 FROM meta").fetchone() is None:
+                # A new file, or one written before the running total existed
+                connection.execute("INSERT OR IGNORE INTO meta SELECT 0, COALESCE(SUM(size), 0) FROM results")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            db = self._connection()
+            row = db.execute("SELECT media_type, codec, body, accessed FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            media_type, codec, body, accessed = row
+            now = time.time()
+            if now - accessed > DISK_TOUCH_SECONDS:
+                db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            entry = CachedResponse(_decompress(codec, body), media_type)
+        except sqlite3.Error:
+            self.errors += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        codec, body = _compress(entry.body)
+        if len(body) > self.max_bytes:
+            return
+        try:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                replaced = db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, entry.media_type, codec, body, len(body), time.time()))
+                db.execute("UPDATE meta SET size = size + ?", (len(body) - (replaced[0] if replaced else 0),))
+                self._evict(db)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _evict(self, db: sqlite3.Connection):
+        # Least recently used first, a batch at a time, until the total fits
+        size = db.execute("SELECT size FROM meta").fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        while size > self.max_bytes:
+            oldest = db.execute("SELECT key, size FROM results ORDER BY accessed LIMIT 64").fetchall()
+            if not oldest:
+                size = 0
+                break
+            for key, entry_size in oldest:
+                db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.evictions += 1
+                size -= entry_size
+                if size <= self.max_bytes:
+                    break
+        db.execute("UPDATE meta SET size = ?", (size,))
+
+    def clear(self):
+        try:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM results")
+                db.execute("UPDATE meta SET size = 0")
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        # Entries and bytes are for the shared file, the counters for this process
+        try:
+            entries, size = self._connection().execute(
+                "SELECT (SELECT COUNT(*) FROM results), size FROM meta").fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, disk: Optional[DiskResultCache] = None):
+        self.max_bytes = max_bytes
+        # Consulted on a miss here; what it returns is kept here as well
+        self.disk = disk
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+        if self.disk is None:
+            return None
+        entry = self.disk.get(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        self._remember(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+
+    def _remember(self, key: str, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key).body)
+            while self._entries and self.size + len(entry.body) > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self.size -= len(dropped.body)
+                self.evictions += 1
+            self._entries[key] = entry
+            self.size += len(entry.body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+        stats["disk"] = None if self.disk is None else self.disk.stats()
+        return stats
+
+
+result_cache = ResultCache(disk=DiskResultCache(RESULT_CACHE_PATH) if RESULT_CACHE_PATH else None)
@@ -0,0 +1,50 @@
+import time
+from typing import Callable, Generator, List
+from app.context import collect_context
+from app.models import AlgorithmResult, Metrics, ResultSummary, Step
+
+# Every solver is written as a generator that yields Steps (built through
+# models.TraceRecorder) while it runs and returns a ResultSummary when done.
+# The helpers here consume such a trace, either fully (solve_* functions) or
+# incrementally (streaming routes).
+StepTrace = Generator[Step, None, ResultSummary]
+
+
+def drain(trace: StepTrace, emit: Callable[[Step], None]) -> ResultSummary:
+    while True:
+        try:
+            step = next(trace)
+        except StopIteration as stop:
+            return stop.value
+        emit(step)
+
+
+def build_result(steps: List[Step], summary: ResultSummary, time_taken: float) -> AlgorithmResult:
+    return AlgorithmResult(
+        steps=steps,
+        result_value=summary.result_value,
+        selected_items=summary.selected_items,
+        metrics=build_metrics(summary, time_taken, len(steps)),
+        context=collect_context(steps)
+    )
+
+
+def build_metrics(summary: ResultSummary, time_taken: float, step_count: int) -> Metrics:
+    return Metrics(
+        time_taken=time_taken,
+        space_complexity=summary.space_complexity,
+        time_complexity=summary.time_complexity,
+        step_count=step_count,
+        dropped_steps=summary.dropped_steps
+    )
+
+
+def run_trace(trace: StepTrace, render: bool = True) -> AlgorithmResult:
+    """
+    Collects a whole trace. With render=False deferred descriptions are left
+    as template + args (see app.descriptions) for clients that format them.
+    """
+    start_time = time.time()
+    steps: List[Step] = []
+    summary = drain(trace, (lambda step: steps.append(step.render())) if render else steps.append)
+    return build_result(steps, summary, time.time() - start_time)